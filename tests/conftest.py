@@ -0,0 +1,28 @@
+"""
+The topcodes modules import each other by their plain names (they are
+run from inside the topcodes directory), the tests do the same.
+Helpers shared by the tests are imported from here.
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "topcodes"))
+
+import synthetic
+
+# thresholding engines that must find the same codes
+ENGINES = ("array", "reference")
+
+
+def found(codes):
+    """
+    Comparable codes. Codes of bands, strips and windows are shifted by
+    their origin, which may change the last bit of x and y.
+    """
+    return sorted((c.code, round(c.x, 6), round(c.y, 6), c.unit, c.orientation, c.confidence) for c in codes)
+
+
+def scene(count, diameter, width, height, noise=0.0, blur=0.0, seed=0):
+    """A synthetic scene of count codes placed with the seed"""
+    codes = synthetic.placeCodes(count, diameter, width, height, seed)
+    return synthetic.scene(width, height, codes, noise=noise, blur=blur, seed=seed)
@@ -0,0 +1,32 @@
+import numpy as np
+import pytest
+from scanner import Scanner
+from conftest import ENGINES, found, scene
+
+
+def _scene(seed):
+    return scene(6, 48, 320, 240, noise=2.0, seed=seed)
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_reuse_matches_fresh_buffers(engine):
+    # the second frame has another size, the buffers are replaced
+    frames = [_scene(1), scene(10, 36, 321, 239, 3.0, 0.6, 3), _scene(1)]
+    fresh = Scanner("array")
+    fresh.setBufferReuse(False)
+    reused = Scanner(engine)
+    for frame in frames:
+        expected = found(fresh.scan_image(frame))
+        assert expected
+        assert found(reused.scan_image(frame)) == expected
+        assert np.array_equal(reused._bw, fresh._bw)
+        assert np.array_equal(reused._cand, fresh._cand)
+
+
+def test_reuse_keeps_buffers():
+    scanner = Scanner()
+    scanner.scan_image(_scene(1))
+    bw = scanner._bw
+    scanner.scan_image(_scene(2))
+    assert np.shares_memory(bw, scanner._bw)
+    assert scanner.residentBytes > 0
@@ -0,0 +1,25 @@
+import numpy as np
+import pytest
+import bullseye
+import synthetic
+from scanner import Scanner
+from conftest import ENGINES
+
+
+def test_clusters_keep_their_points():
+    xs = np.array([5, 6, 5, 5, 5, 20])
+    ys = np.array([5, 5, 6, 7, 8, 9])
+    groups = bullseye.clusters(xs, ys)
+    assert [(first, size) for first, _, _, size, _ in groups] == [(0, 5), (5, 1)]
+    assert sorted(groups[0][4]) == [(5, 5), (5, 6), (5, 7), (5, 8), (6, 5)]
+    # only the neighbours of the rounded centroid (5, 6) are retried
+    assert bullseye.nearest(groups[0][4], 5.2, 5.9) == [(5, 5), (5, 7), (6, 5)]
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_noisy_centroid_falls_back_to_cluster_points(engine):
+    # the centroids of 681 and 1189 don't read, points of their clusters do
+    codes = synthetic.placeCodes(10, 36, 480, 360, seed=13)
+    image = synthetic.scene(480, 360, codes, noise=3, blur=0.6, seed=3)
+    found = sorted(code.code for code in Scanner(engine).scan_image(image))
+    assert found == [271, 333, 369, 563, 611, 611, 681, 1189]
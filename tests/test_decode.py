@@ -0,0 +1,55 @@
+import pytest
+import bullseye
+import instrument
+import synthetic
+from scanner import Scanner
+from topcode import TopCode
+
+
+def _scanner(threshold):
+    codes = synthetic.placeCodes(6, 48, 320, 240, seed=4)
+    scanner = Scanner()
+    scanner.setConfidenceThreshold(threshold)
+    scanner.setProbe(instrument.Recorder())
+    found = scanner.scan_image(synthetic.scene(320, 240, codes, noise=2.0, seed=4))
+    assert found
+    return scanner, found
+
+
+def test_early_reading_uses_the_adjusted_unit():
+    scanner, found = _scanner(0.5)
+    early = lambda: scanner.probe.counters.get("decode.early", 0)
+    checked = 0
+    for code in found:
+        spot = TopCode()
+        before = early()
+        scanner.decode(spot, round(code.x), round(code.y))
+        if early() == before:
+            continue
+        checked += 1
+        reread = TopCode()
+        reread.setLocation(spot.x, spot.y)
+        reread.unit = spot.unit
+        assert spot.confidence == scanner.readCode(reread, spot.unit, 0.0)
+    assert checked
+
+
+def test_threshold_finds_the_same_codes():
+    _, expected = _scanner(0.0)
+    _, found = _scanner(0.5)
+    assert sorted(c.code for c in found) == sorted(c.code for c in expected)
+
+
+@pytest.mark.parametrize("threshold", [0.0, 0.5])
+def test_decode_many_matches_decode(threshold):
+    scanner, _ = _scanner(threshold)
+    xs, ys = bullseye.centers(scanner._cand)
+    points = [(round(cx), round(cy)) for _, cx, cy, _, _ in bullseye.clusters(xs, ys)]
+    expected = []
+    for cx, cy in points:
+        spot = TopCode()
+        scanner.decode(spot, cx, cy)
+        expected.append((spot.code, spot.x, spot.y, spot.unit, spot.confidence, spot.orientation))
+    assert any(code < 0 for code, *_ in expected) and any(code >= 0 for code, *_ in expected)
+    found = scanner.decodeMany(points)
+    assert [(c.code, c.x, c.y, c.unit, c.confidence, c.orientation) for c in found] == expected
@@ -0,0 +1,24 @@
+import numpy as np
+import pytest
+from scanner import Scanner
+from conftest import ENGINES, found, scene
+
+# (codes, diameter, width, height, noise, blur, seed)
+SCENES = [
+    (6, 48, 320, 240, 0.0, 0.0, 1),
+    (6, 48, 320, 240, 2.0, 0.0, 2),
+    (10, 36, 321, 239, 3.0, 0.6, 3),
+]
+
+
+@pytest.mark.parametrize("setup", SCENES)
+def test_engines_agree(setup):
+    image = scene(*setup)
+    array, reference = (Scanner(engine) for engine in ENGINES)
+    expected = found(array.scan_image(image))
+    assert expected
+    assert found(reference.scan_image(image)) == expected
+    assert np.array_equal(reference._bw, array._bw)
+    assert np.array_equal(reference._cand, array._cand)
+    assert reference.ccount == array.ccount
+    assert reference.tcount == array.tcount
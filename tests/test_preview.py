@@ -0,0 +1,65 @@
+import numpy as np
+from PIL import Image
+import preview
+import synthetic
+from scanner import Scanner
+
+BLACK = (0, 0, 0, 255)
+WHITE = (255, 255, 255, 255)
+GREEN = (0, 255, 0, 255)
+RED = (255, 0, 0, 255)
+BLUE = (0, 0, 255, 255)
+
+
+def test_render_colors():
+    bw = np.zeros((20, 30), dtype=np.uint8)
+    bw[:, 15:] = 1
+    cand = np.zeros_like(bw)
+    cand[10, 20] = 1
+    image = preview.render(bw, cand, tested=[(5, 5), (0, 19)], outlines=[(22.0, 10.0, 10.0)])
+    assert image.mode == "RGBA" and image.size == (30, 20)
+    pixels = np.asarray(image)
+    assert tuple(pixels[0, 10]) == BLACK and tuple(pixels[0, 25]) == WHITE
+    assert tuple(pixels[10, 20]) == GREEN
+    # tested centers are painted with their 3x3 neighbourhood, clipped at the border
+    assert (pixels[4:7, 4:7] == RED).all() and tuple(pixels[3, 5]) == BLACK
+    assert (pixels[18:20, 0:2] == RED).all()
+    # the outline circles (22, 10) with radius 5
+    assert tuple(pixels[10, 17]) == BLUE and tuple(pixels[10, 22]) != BLUE
+    for color, argb in zip((BLACK, WHITE, GREEN, RED, BLUE), preview.COLORS):
+        assert color == ((argb >> 16) & 0xFF, (argb >> 8) & 0xFF, argb & 0xFF, argb >> 24)
+
+
+def test_render_without_overlays():
+    bw = np.eye(8, dtype=np.uint8)
+    pixels = np.asarray(preview.render(bw))
+    assert (pixels[bw == 1] == WHITE).all() and (pixels[bw == 0] == BLACK).all()
+
+
+def test_preview_of_a_scan():
+    codes = synthetic.placeCodes(3, 60, 320, 240, seed=4)
+    scanner = Scanner()
+    found = scanner.scan_image(synthetic.scene(320, 240, codes, seed=4))
+    assert len(found) == 3
+    plain = scanner.getPreview(candidates=False, tested=False)
+    assert np.array_equal(np.asarray(plain)[:, :, 0] // 255, scanner._bw)
+    pixels = np.asarray(scanner.getPreview(outlines=True))
+    assert (pixels == GREEN).all(axis=2).any() and (pixels == RED).all(axis=2).any()
+    for code in found:
+        # the blue outline crosses the row of the code center
+        row = (pixels[round(code.y)] == BLUE).all(axis=1)
+        assert row[: round(code.x)].any() and row[round(code.x) :].any()
+
+
+def test_preview_cache():
+    codes = synthetic.placeCodes(3, 60, 320, 240, seed=4)
+    scanner = Scanner()
+    scanner.scan_image(synthetic.scene(320, 240, codes, seed=4))
+    first = scanner.getPreview()
+    assert scanner.getPreview() is first
+    assert scanner.getPreview(outlines=True) is not first
+    # a new scan renders a new preview
+    scanner.scan_image(Image.new("RGB", (320, 240), (255, 255, 255)))
+    blank = scanner.getPreview()
+    assert blank is not first
+    assert (np.asarray(blank) == WHITE).all()
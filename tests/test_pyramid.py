@@ -0,0 +1,36 @@
+import pyramid
+import synthetic
+from scanner import Scanner
+
+
+def test_windows_start_on_even_rows():
+    centers = [(50.0, 0.0), (300.4, 181.0), (10.0, 333.0), (599.0, 600.6)]
+    for height in (601, 640, 121, 99):
+        wx, wy, corners = pyramid.windows(centers, 60, 600, height)
+        assert wy % 2 == 0 and wy <= height and wx == 122
+        for (x, y), (x0, y0) in zip(centers, corners):
+            assert y0 % 2 == 0 and 0 <= y0 and y0 + wy <= height
+            assert 0 <= x0 and x0 + wx <= 600
+            if wy > 120:
+                # windows as high as an odd frame leave out its last row
+                assert y0 <= max(0, round(y) - 60) and min((height & ~1) - 1, round(y) + 60) < y0 + wy
+
+
+def test_pyramid_finds_the_codes_of_a_full_scan():
+    codes = synthetic.placeCodes(6, 72, 800, 601, seed=4)
+    image = synthetic.scene(800, 601, codes, noise=2.0, blur=0.6, seed=4)
+    expected = sorted(code.code for code in Scanner().scan_image(image))
+    assert len(expected) == 6
+    scanner = Scanner()
+    scanner.setMinCodeDiameter(64)
+    assert sorted(code.code for code in scanner.scan_image(image)) == expected
+
+
+def test_pyramid_keeps_the_maximum_diameter():
+    codes = synthetic.placeCodes(3, 120, 800, 600, seed=1)
+    image = synthetic.scene(800, 600, codes, seed=1)
+    scanner = Scanner()
+    scanner.setMinCodeDiameter(48)
+    assert len(scanner.scan_image(image)) == 3
+    scanner.setMaxCodeDiameter(64)
+    assert scanner.scan_image(image) == []
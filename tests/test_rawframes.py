@@ -0,0 +1,131 @@
+import numpy as np
+import pytest
+import instrument
+import rawframes
+import synthetic
+from scanner import Scanner
+from conftest import found
+
+
+@pytest.fixture(scope="module")
+def frame():
+    codes = synthetic.placeCodes(4, 50, 320, 240, seed=5)
+    image = synthetic.scene(320, 240, codes, noise=2.0, seed=5)
+    rgb = np.asarray(image)
+    expected = found(Scanner().scan_image(image))
+    assert len(expected) == 4
+    return rgb, expected
+
+
+def _argb(rgb):
+    r, g, b = (rgb[:, :, k].astype(np.uint32) for k in range(3))
+    return 0xFF000000 | (r << 16) | (g << 8) | b
+
+
+def _buffers(rgb):
+    height, width, _ = rgb.shape
+    gray = (rgb.astype(np.uint16).sum(axis=2) // 3).astype(np.uint8)
+    yuyv = np.full((height, width, 2), 128, dtype=np.uint8)
+    yuyv[:, :, 0] = gray
+    argb = _argb(rgb)
+    return {
+        "argb uint32": ("argb", argb),
+        "argb int32": ("argb", argb.view(np.int32)),
+        # java ints are signed, opaque pixels are negative
+        "argb int64": ("argb", argb.view(np.int32).astype(np.int64).ravel()),
+        "argb list": ("argb", argb.view(np.int32).ravel().tolist()),
+        "argb bytes": ("argb", argb.tobytes()),
+        "gray8": ("gray8", gray.tobytes()),
+        "rgb24": ("rgb24", rgb.tobytes()),
+        "bgr24": ("bgr24", np.ascontiguousarray(rgb[:, :, ::-1])),
+        "yuyv": ("yuyv", bytearray(yuyv.tobytes())),
+    }
+
+
+@pytest.mark.parametrize(
+    "name",
+    ["argb uint32", "argb int32", "argb int64", "argb list", "argb bytes", "gray8", "rgb24", "bgr24", "yuyv"],
+)
+def test_rgb_data_scans_like_the_image(frame, name):
+    rgb, expected = frame
+    format, buffer = _buffers(rgb)[name]
+    assert found(Scanner().scan_rgb_data(buffer, rgb.shape[1], rgb.shape[0], format)) == expected
+
+
+@pytest.mark.parametrize("format", ["argb", "gray8", "rgb24"])
+def test_rgb_data_with_row_padding(frame, format):
+    rgb, expected = frame
+    height, width, _ = rgb.shape
+    rows = np.frombuffer(_buffers(rgb)["argb bytes" if format == "argb" else format][1], dtype=np.uint8)
+    rows = rows.reshape(height, -1)
+    padded = np.zeros((height, rows.shape[1] + 13), dtype=np.uint8)
+    padded[:, : rows.shape[1]] = rows
+    codes = Scanner().scan_rgb_data(padded.tobytes(), width, height, format, stride=padded.shape[1])
+    assert found(codes) == expected
+
+
+def test_argb_must_be_integers(frame):
+    rgb, _ = frame
+    with pytest.raises(ValueError):
+        Scanner().scan_rgb_data(_argb(rgb).astype(np.float64), rgb.shape[1], rgb.shape[0])
+
+
+@pytest.fixture(scope="module")
+def video():
+    frames = [np.asarray(frame) for frame in synthetic.video(5, 320, 240, count=3, diameter=64, seed=2)]
+    expected = [found(Scanner().scan_image(frame)) for frame in frames]
+    assert all(len(codes) == 3 for codes in expected)
+    return frames, expected
+
+
+def _planes(frames, format):
+    if format == "rgb24":
+        return frames
+    gray = [(frame.astype(np.uint16).sum(axis=2) // 3).astype(np.uint8) for frame in frames]
+    if format == "gray8":
+        return gray
+    yuyv = [np.full(plane.shape + (2,), 128, dtype=np.uint8) for plane in gray]
+    for frame, plane in zip(yuyv, gray):
+        frame[:, :, 0] = plane
+    return yuyv
+
+
+@pytest.mark.parametrize("format", ["gray8", "yuyv", "rgb24"])
+def test_sequence_round_trip(tmp_path, video, format):
+    frames, expected = video
+    planes = _planes(frames, format)
+    filename = str(tmp_path / "frames.raw")
+    assert rawframes.writeSequence(filename, planes, format) == 5
+    sequence = rawframes.RawSequence(filename)
+    assert (len(sequence), sequence.width, sequence.height, sequence.format) == (5, 320, 240, format)
+    assert np.array_equal(sequence[3].reshape(planes[3].shape), planes[3])
+    assert [(index, found(codes)) for index, codes in sequence.scan(Scanner())] == list(enumerate(expected))
+    # frames of one or two bytes per pixel are scanned as gray planes
+    assert [found(Scanner().scan_image(frame)) for frame in sequence] == expected
+    assert [found(codes) for _, codes in Scanner().stream(sequence)] == expected
+
+
+def test_headerless_sequence(tmp_path, video):
+    frames, expected = video
+    filename = str(tmp_path / "dump.raw")
+    with open(filename, "wb") as f:
+        f.write(b"\0" * 7)
+        for plane in _planes(frames, "gray8"):
+            f.write(plane.tobytes())
+    with pytest.raises(ValueError):
+        rawframes.RawSequence(filename)
+    sequence = rawframes.RawSequence(filename, 320, 240, "gray8", offset=7)
+    assert len(sequence) == 5
+    assert [found(codes) for _, codes in sequence.scan(Scanner())] == expected
+
+
+def test_sequence_in_worker_processes(tmp_path, video):
+    frames, expected = video
+    filename = str(tmp_path / "frames.raw")
+    rawframes.writeSequence(filename, _planes(frames, "yuyv"), "yuyv")
+    scanner = Scanner()
+    recorder = instrument.Recorder()
+    scanner.setProbe(recorder)
+    results = list(rawframes.RawSequence(filename).scan(scanner, jobs=2))
+    assert [(index, found(codes)) for index, codes in results] == list(enumerate(expected))
+    assert recorder.frames == 5
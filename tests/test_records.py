@@ -0,0 +1,69 @@
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pytest
+import records
+import synthetic
+from scanner import Scanner
+
+
+def _fields(codes):
+    return [(c.code, c.confidence, c.x, c.y, c.unit, c.orientation) for c in codes]
+
+
+@pytest.fixture(scope="module")
+def scene():
+    codes = synthetic.placeCodes(8, 48, 480, 360, seed=6)
+    image = synthetic.scene(480, 360, codes, noise=2.0, seed=6)
+    found = Scanner().scan_image(image)
+    assert len(found) == 8
+    return image, found
+
+
+def test_records_round_trip(scene):
+    _, found = scene
+    table = records.fromCodes(found)
+    assert table.dtype == records.RECORD and table.shape == (8,)
+    assert table["code"].tolist() == [code.code for code in found]
+    data = records.pack(table)
+    assert len(data) == 8 + 8 * records.RECORD.itemsize
+    unpacked = records.unpack(data)
+    assert not unpacked.flags.writeable
+    assert np.array_equal(unpacked, table)
+    assert _fields(records.toCodes(unpacked)) == _fields(found)
+    # a memoryview of a larger buffer works as well
+    assert np.array_equal(records.unpack(memoryview(bytearray(data + b"tail"))), table)
+
+
+def test_empty_records():
+    table = records.fromCodes([])
+    assert table.shape == (0,)
+    assert records.toCodes(records.unpack(records.pack(table))) == []
+
+
+def test_unpack_rejects_bad_data(scene):
+    _, found = scene
+    data = records.pack(records.fromCodes(found))
+    with pytest.raises(ValueError, match="too short"):
+        records.unpack(data[:5])
+    with pytest.raises(ValueError, match="not packed"):
+        records.unpack(b"XXXX" + data[4:])
+    with pytest.raises(ValueError, match="truncated: 7 of 8"):
+        records.unpack(data[:-1])
+
+
+def test_result_format_records(scene):
+    image, found = scene
+    scanner = Scanner()
+    scanner.setResultFormat("records")
+    assert scanner.resultFormat == "records"
+    expected = records.fromCodes(found)
+    assert np.array_equal(scanner.scan_image(image), expected)
+    rgb = np.asarray(image)
+    assert np.array_equal(scanner.scan_rgb_data(rgb.tobytes(), 480, 360, "rgb24"), expected)
+    [(_, streamed)] = list(scanner.stream([image]))
+    assert np.array_equal(streamed, expected)
+    with ThreadPoolExecutor(2) as executor:
+        tiled = scanner.scan_tiled(image, 2, executor)
+    assert isinstance(tiled, np.ndarray) and sorted(tiled["code"].tolist()) == sorted(expected["code"].tolist())
+    with pytest.raises(ValueError):
+        scanner.setResultFormat("json")
@@ -0,0 +1,27 @@
+import pytest
+import roi
+from scanner import Scanner
+from conftest import ENGINES, found, scene
+
+
+def _scanner(region=None, engine="array"):
+    scanner = Scanner(engine)
+    scanner.setMaxCodeDiameter(60)
+    scanner.setRegionOfInterest(region)
+    return scanner
+
+
+def test_windows_start_on_even_rows():
+    region = roi.RegionOfInterest([(201, 301, 441, 501), (20, 33, 90, 97)])
+    for x0, y0, x1, y1 in region.windows(640, 800, _scanner()._maxu):
+        assert y0 % 2 == 0
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+@pytest.mark.parametrize("seed", [7, 16, 18, 19])
+def test_region_matches_full_scan(seed, engine):
+    region = roi.RegionOfInterest([(201, 301, 441, 501), (20, 33, 150, 97)])
+    image = scene(40, 40, 640, 800, noise=2.0, blur=0.6, seed=seed)
+    expected = found(c for c in _scanner().scan_image(image) if region.contains(c.x, c.y))
+    assert expected
+    assert found(_scanner(region, engine).scan_image(image)) == expected
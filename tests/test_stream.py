@@ -0,0 +1,78 @@
+import threading
+import time
+import pytest
+import pipeline
+import synthetic
+from scanner import Scanner
+from tracker import TrackingScanner
+from conftest import found
+
+
+def _region():
+    scanner = Scanner()
+    scanner.setRegionOfInterest([(40, 30, 200, 150)])
+    return scanner
+
+
+def _pyramid():
+    scanner = Scanner()
+    scanner.setMinCodeDiameter(48)
+    return scanner
+
+
+def _tracker():
+    return TrackingScanner(cadence=3)
+
+
+@pytest.mark.parametrize("make", [_region, _pyramid, _tracker])
+def test_stream_scans_like_scan_image(make):
+    frames = list(synthetic.video(6, 320, 240, count=4, diameter=64, seed=2))
+    single = make()
+    expected = [found(single.scan_image(frame)) for frame in frames]
+    assert any(expected)
+    streamed = make()
+    results = [(index, found(codes)) for index, codes in streamed.stream(frames)]
+    assert results == list(enumerate(expected))
+    # the last frame was scanned the same way
+    assert (streamed.ccount, streamed.tcount) == (single.ccount, single.tcount)
+
+
+def test_stream_keeps_tracking():
+    tracker = _tracker()
+    for _ in tracker.stream(synthetic.video(6, 320, 240, count=4, diameter=64, seed=2)):
+        pass
+    # frames 1, 2, 4 and 5 only scan around the codes of the frame before
+    assert not tracker.fullScan
+
+
+def test_latest_drops_frames_of_a_list():
+    frames = list(synthetic.video(30, 320, 240, count=4, diameter=64, seed=2))
+    stream = pipeline.FramePipeline(Scanner(), latest=True)
+    results = list(stream.run(frames))
+    indices = [index for index, _ in results]
+    # a list delivers faster than any stage, only the last frames are left
+    assert indices == sorted(indices) and indices[-1] == 29
+    assert stream.dropped > 0 and stream.dropped + len(results) == 30
+    for index, codes in results:
+        assert found(codes) == found(Scanner().scan_image(frames[index]))
+
+
+def test_closing_does_not_wait_for_the_source():
+    frame = next(synthetic.video(1, 320, 240, count=4, diameter=64, seed=2))
+    release = threading.Event()
+
+    def camera():
+        yield frame
+        # no next frame until the test ends
+        release.wait(10)
+        yield frame
+
+    results = Scanner().stream(camera())
+    try:
+        index, codes = next(results)
+        assert index == 0 and len(codes) == 4
+        start = time.perf_counter()
+        results.close()
+        assert time.perf_counter() - start < 1.0
+    finally:
+        release.set()
@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+from PIL import Image
+import strips
+import synthetic
+from scanner import Scanner
+from conftest import found
+
+
+@pytest.fixture(scope="module")
+def tall():
+    codes = synthetic.placeCodes(12, 48, 300, 1500, seed=3)
+    image = synthetic.scene(300, 1500, codes, noise=2.0, blur=0.6, seed=3)
+    expected = found(Scanner().scan_image(image))
+    assert len(expected) == 12
+    return image, expected
+
+
+@pytest.mark.parametrize("rows", [64, 100, 257, 2000])
+def test_strips_match_full_scan(tall, rows):
+    image, expected = tall
+    rgb = np.asarray(image)
+    assert found(Scanner().scan_strips(rgb[y0 : y0 + rows] for y0 in range(0, 1500, rows))) == expected
+
+
+def test_strips_yield_codes_before_the_last_strip(tall):
+    image, _ = tall
+    rgb = np.asarray(image)
+    read = []
+
+    def bands():
+        for y0 in range(0, 1500, 100):
+            read.append(y0)
+            yield rgb[y0 : y0 + 100]
+
+    code = next(Scanner().scan_strips(bands()))
+    assert code.isValid and len(read) < 15
+
+
+@pytest.mark.parametrize("suffix", [".ppm", ".bmp"])
+def test_strips_read_uncompressed_files(tmp_path, tall, suffix):
+    image, expected = tall
+    filename = str(tmp_path / ("tall" + suffix))
+    image.save(filename)
+    with Image.open(filename) as stored:
+        if suffix == ".bmp":
+            # BMP rows are stored bottom-up
+            assert stored.tile[0][3][2] < 0
+        bands = list(strips.imageBands(stored, 128))
+        assert all(isinstance(band, np.ndarray) for band in bands)
+        assert sum(band.shape[0] for band in bands) == 1500
+    with Image.open(filename) as stored:
+        assert found(Scanner().scan_strips(stored, 128)) == expected
+
+
+def test_strips_of_different_width():
+    bands = [np.full((64, 200), 255, dtype=np.uint8), np.full((64, 201), 255, dtype=np.uint8)]
+    with pytest.raises(ValueError):
+        list(Scanner().scan_strips(bands))
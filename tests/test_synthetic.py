@@ -0,0 +1,39 @@
+import math
+import synthetic
+from scanner import Scanner
+
+
+def _matches(found, placed):
+    """True if found is placed, up to the pixel grid and a tenth of a sector"""
+    turn = (found.orientation - placed.orientation) % (2 * math.pi)
+    return (
+        found.code == placed.code
+        and math.hypot(found.x - placed.x, found.y - placed.y) <= 1.5
+        and abs(found.unit - placed.unit) <= 0.05 * placed.unit
+        and min(turn, 2 * math.pi - turn) <= 0.15
+    )
+
+
+def test_codes_fit_and_keep_apart():
+    placed = synthetic.placeCodes(12, 48, 400, 300, seed=7)
+    assert len(placed) == 12
+    assert [c.code for c in placed] == [c.code for c in synthetic.placeCodes(12, 48, 400, 300, seed=7)]
+    for k, a in enumerate(placed):
+        assert 24 < a.x < 376 and 24 < a.y < 276
+        assert all(math.hypot(a.x - b.x, a.y - b.y) >= 48 * 1.15 for b in placed[k + 1 :])
+
+
+def test_scan_finds_the_placed_codes():
+    placed = synthetic.placeCodes(8, 48, 400, 300, seed=7)
+    found = Scanner().scan_image(synthetic.scene(400, 300, placed, noise=2.0, seed=7))
+    assert len(found) == len(placed)
+    for code in placed:
+        assert any(_matches(f, code) for f in found)
+
+
+def test_stream_finds_the_placed_codes():
+    placed = sorted(c.code for c in synthetic.placeCodes(4, 64, 320, 240, seed=2))
+    results = list(Scanner().stream(synthetic.video(6, 320, 240, count=4, diameter=64, seed=2)))
+    assert [index for index, _ in results] == list(range(6))
+    for _, codes in results:
+        assert sorted(c.code for c in codes) == placed
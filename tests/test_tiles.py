@@ -0,0 +1,50 @@
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import pickle
+import pytest
+import instrument
+import tiles
+from scanner import Scanner
+from conftest import ENGINES, found, scene
+
+
+def test_bands_start_on_even_rows():
+    for height, count in ((1600, 3), (1601, 3), (999, 7), (5, 4)):
+        jobs = tiles.bands(height, count, 121)
+        assert jobs[0][2] == 0 and jobs[-1][3] == height
+        for y0, y1, c0, c1 in jobs:
+            assert y0 % 2 == 0 and c0 % 2 == 0
+            assert y0 <= c0 < c1 <= y1
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_tiled_matches_full_scan(engine):
+    # 3 bands over 1600 rows used to start the second band on row 121
+    image = scene(40, 40, 400, 1600, noise=2.0, blur=0.6, seed=0)
+    expected = found(Scanner("array").scan_image(image))
+    assert expected
+    with ThreadPoolExecutor(3) as executor:
+        assert found(Scanner(engine).scan_tiled(image, 3, executor)) == expected
+
+
+def test_tiled_reports_to_the_recorder():
+    # bands scanned in other processes send their measurements back
+    image = scene(20, 40, 400, 1200, seed=1)
+    scanner = Scanner()
+    recorder = instrument.Recorder(trace=True)
+    scanner.setProbe(recorder)
+    with ProcessPoolExecutor(2) as executor:
+        tiled = scanner.scan_tiled(image, 3, executor)
+    counters = recorder.counters
+    assert counters["decode.valid"] >= len(tiled) == 20
+    assert (counters["ccount"], counters["tcount"]) == (scanner.ccount, scanner.tcount)
+    assert recorder.frames == 1
+    assert recorder.histogram("threshold").count == 1
+    assert {event["name"] for event in recorder.chromeTrace()["traceEvents"]} >= {"frame", "threshold", "find"}
+
+
+def test_recorder_pickles():
+    recorder = instrument.Recorder()
+    recorder.count("tcount", 3)
+    copy = pickle.loads(pickle.dumps(recorder))
+    copy.count("tcount")
+    assert copy.counters == {"tcount": 4} and recorder.counters == {"tcount": 3}
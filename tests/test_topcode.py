@@ -0,0 +1,54 @@
+import pytest
+import topcode
+from topcode import TopCode
+
+SECTORS = TopCode().SECTORS
+ARC = TopCode().ARC
+
+
+def _checksum(bits):
+    # the loop of the java version
+    summ = 0
+    for i in range(SECTORS):
+        summ += bits & 0x01
+        bits = bits >> 1
+    return summ == 5
+
+
+def _rotateLowest(code, bits, arca):
+    # the loop of the java version
+    minimum = bits
+    for i in range(1, SECTORS + 1):
+        bits = ((bits << 1) & 0x1FFF) | (bits >> (SECTORS - 1))
+        if bits < minimum:
+            minimum = bits
+            code.orientation = i * -1 * ARC
+    code.orientation = code.orientation + (arca - ARC * 0.65)
+    return minimum
+
+
+def test_checksum_matches_the_loop():
+    code = TopCode()
+    for bits in range(1 << 14):
+        assert code.checksum(bits) == _checksum(bits)
+
+
+@pytest.mark.parametrize("arca", [0.0, 0.137])
+def test_rotate_lowest_matches_the_loop(arca):
+    table, loop = TopCode(), TopCode()
+    for bits in range(1 << 13):
+        table.orientation = loop.orientation = 0.25
+        assert table.rotateLowest(bits, arca) == _rotateLowest(loop, bits, arca)
+        assert table.orientation == loop.orientation
+
+
+def test_generate_codes():
+    codes = topcode.generateCodes()
+    values = [code.code for code in codes]
+    assert len(codes) == 99 and values[0] == 31 and values[-1] == 1189
+    assert values == sorted(values) and list(topcode.VALID_CODES) == values
+    for index, code in enumerate(codes):
+        assert code.orientation == 0 and _checksum(code.code)
+        assert _rotateLowest(TopCode(), code.code, 0) == code.code
+        assert topcode.codeIndex(code.code) == index
+    assert topcode.codeIndex(30) == -1
@@ -0,0 +1,37 @@
+import pytest
+import instrument
+import synthetic
+from tracker import TrackingScanner
+from conftest import found
+
+
+def test_tracked_frames_use_the_confidence_threshold():
+    tracker = TrackingScanner(cadence=3)
+    tracker.setConfidenceThreshold(0.8)
+    probe = instrument.Recorder()
+    tracker.setProbe(probe)
+    frames = list(synthetic.video(3, 320, 240, count=4, diameter=64, seed=2))
+    tracker.scan_image(frames[0])
+    early = probe.counters.get("decode.early", 0)
+    tracker.scan_image(frames[1])
+    assert not tracker.fullScan
+    assert probe.counters.get("decode.early", 0) > early
+
+
+def test_regions_start_on_even_rows():
+    tracker = TrackingScanner()
+    codes = synthetic.placeCodes(3, 48, 1000, 800, seed=1)
+    tracker.scan_image(synthetic.scene(1000, 800, codes, seed=1))
+    boxes = tracker.regions(1000, 800)
+    assert boxes and all(y0 % 2 == 0 for _, y0, _, _ in boxes)
+
+
+@pytest.mark.parametrize("seed", [1, 11, 12])
+def test_tracked_frame_matches_full_scan(seed):
+    # regions used to start on odd rows and threshold differently
+    codes = synthetic.placeCodes(3, 48, 1000, 800, seed=seed)
+    image = synthetic.scene(1000, 800, codes, noise=2.0, blur=0.6, seed=seed)
+    tracker = TrackingScanner(cadence=5)
+    expected = found(tracker.scan_image(image))
+    assert found(tracker.scan_image(image)) == expected
+    assert not tracker.fullScan
@@ -0,0 +1,61 @@
+"""
+Command line entry point
+
+    python -m topcodes scan <files or directories...> [--jobs N]
+    python -m topcodes bench [--suite quick|full] [--baseline file]
+
+python version by PapstJL4U
+"""
+import argparse as argparse
+import os as os
+import sys as sys
+
+# the modules import each other by plain module name
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import batch
+import benchmark
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m topcodes", description="TopCode scanner")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    scan = commands.add_parser("scan", help="scan image files, results as JSON lines on stdout")
+    scan.add_argument("paths", nargs="+", help="image files or directories")
+    scan.add_argument("--jobs", "-j", type=int, default=None, help="worker processes (default: one per core)")
+    scan.add_argument("--engine", choices=("array", "reference"), default="array", help="thresholding engine")
+    scan.add_argument("--max-diameter", type=int, default=None, help="maximum code diameter in pixels")
+
+    bench = commands.add_parser("bench", help="benchmark the scanner, results as JSON")
+    bench.add_argument("--suite", choices=tuple(benchmark.SUITES), default="quick", help="cases to run")
+    bench.add_argument(
+        "--engine",
+        action="append",
+        choices=("array", "reference", "array+pyramid", "reference+pyramid"),
+        help="engines (default: array)",
+    )
+    bench.add_argument("--repeat", type=int, default=3, help="timed scans per case")
+    bench.add_argument("--out", default=None, help="write the results to this file")
+    bench.add_argument("--baseline", default=None, help="fail on regressions against this results file")
+    bench.add_argument("--tolerance", type=float, default=0.25, help="allowed relative slowdown")
+    bench.add_argument("--save-baseline", action="store_true", help="store the results as the baseline")
+
+    args = parser.parse_args(argv)
+    if args.command == "scan":
+        return 1 if batch.run(args.paths, args.jobs, args.engine, args.max_diameter) else 0
+    if args.command == "bench":
+        return benchmark.main(
+            args.suite,
+            args.engine or ("array",),
+            args.repeat,
+            args.out,
+            args.baseline,
+            args.tolerance,
+            args.save_baseline,
+        )
+    return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,96 @@
+"""
+Scans many image files in parallel.
+
+Files are fanned out over a process pool. Every worker process keeps
+one warm Scanner for all files it gets, and results are handed back as
+soon as a file is done (not in the order of the file list).
+
+python version by PapstJL4U
+"""
+from typing import Iterable, Iterator, TextIO
+from scanner import Scanner
+import json as json
+import multiprocessing as multiprocessing
+import os as os
+import sys as sys
+import time as T
+
+# image files picked up when a directory is given
+EXTENSIONS: tuple[str, ...] = (".png", ".jpg", ".jpeg", ".bmp", ".gif", ".tif", ".tiff", ".webp")
+
+# the scanner of a worker process
+_scanner: Scanner | None = None
+
+
+def findImages(paths: Iterable[str]) -> Iterator[str]:
+    """Yields the given files and all image files below the given directories"""
+    for path in paths:
+        if not os.path.isdir(path):
+            yield path
+            continue
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            for name in sorted(files):
+                if name.lower().endswith(EXTENSIONS):
+                    yield os.path.join(root, name)
+
+
+def _startWorker(engine: str, diameter: int | None) -> None:
+    """Creates the scanner of a worker process"""
+    global _scanner
+    _scanner = Scanner(engine)
+    if diameter is not None:
+        _scanner.setMaxCodeDiameter(diameter)
+
+
+def _scanFile(path: str) -> dict:
+    """Scans a single file with the scanner of this worker"""
+    try:
+        codes = _scanner.scan_by_filename(path)
+    except Exception as error:
+        return {"file": path, "error": repr(error)}
+    return {
+        "file": path,
+        "codes": [
+            {"code": c.code, "x": c.x, "y": c.y, "diameter": c.diameter, "orientation": c.orientation} for c in codes
+        ],
+    }
+
+
+def scanFiles(
+    paths: Iterable[str], jobs: int | None = None, engine: str = "array", diameter: int | None = None
+) -> Iterator[dict]:
+    """
+    Scans all files with jobs worker processes (default: one per core)
+    and yields one record per file as soon as it is done:
+    {"file": ..., "codes": [{"code", "x", "y", "diameter", "orientation"}]}
+    or {"file": ..., "error": ...} if the file could not be scanned.
+    """
+    with multiprocessing.Pool(jobs, initializer=_startWorker, initargs=(engine, diameter)) as pool:
+        yield from pool.imap_unordered(_scanFile, findImages(paths))
+
+
+def run(
+    paths: Iterable[str],
+    jobs: int | None = None,
+    engine: str = "array",
+    diameter: int | None = None,
+    out: TextIO = sys.stdout,
+    log: TextIO = sys.stderr,
+) -> int:
+    """
+    Writes the results of scanFiles as JSON lines and reports the
+    throughput. Returns the number of files that failed.
+    """
+    images: int = 0
+    failed: int = 0
+    start: float = T.time()
+    for record in scanFiles(paths, jobs, engine, diameter):
+        images += 1
+        failed += "error" in record
+        out.write(json.dumps(record) + "\n")
+        out.flush()
+    elapsed: float = T.time() - start
+    rate: float = images / elapsed if elapsed > 0 else 0.0
+    log.write("scanned %d images (%d failed) in %.2f s: %.2f images/s\n" % (images, failed, elapsed, rate))
+    return failed
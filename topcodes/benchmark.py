@@ -0,0 +1,239 @@
+"""
+Reproducible benchmarks of the scanner.
+
+Every case is a synthetic scene (see synthetic.py) with random code ids,
+positions and rotations from a fixed seed, or one of the images in
+test_img. Each case is scanned by every requested engine and reports
+
+  - per stage latency (median over the repeats, from an instrument.Recorder)
+  - throughput in frames and megapixels per second
+  - peak memory of a scan (tracemalloc, numpy buffers included) plus
+    the buffers the scanner keeps between scans (residentBytes)
+  - detection rate: placed codes found with the right id near their
+    position (files have no ground truth, there the found count is kept)
+
+An engine name with "+pyramid" (e.g. array+pyramid) scans with
+setMinCodeDiameter, see pyramid.py: 0.8 times the diameter of the
+scene's codes, FILE_DIAMETER for the test images. Such runs also
+report the agreement with a full resolution scan of the same engine.
+
+Results are JSON. Compared against a stored baseline, slower stages,
+higher memory or fewer detected codes are reported as regressions:
+
+    python -m topcodes bench --suite quick --baseline topcodes/bench_baseline.json
+
+python version by PapstJL4U
+"""
+from typing import Iterable, TextIO
+from PIL import Image
+from scanner import Scanner
+from instrument import Recorder
+import json as json
+import os as os
+import platform as platform
+import statistics as statistics
+import sys as sys
+import time as T
+import tracemalloc as tracemalloc
+import numpy as np
+import synthetic
+
+# directory of the test images
+IMAGES: str = os.path.join(os.path.dirname(os.path.abspath(__file__)), "test_img")
+
+# minimum code diameter of the test images for pyramid runs
+FILE_DIAMETER: float = 40
+
+# stages reported per case, in pipeline order
+STAGES: tuple[str, ...] = ("frame", "ingest", "threshold", "candidates", "find", "decode")
+
+# name: (width, height, codes, diameter, noise, blur)
+SCENES: dict[str, tuple[int, int, int, float, float, float]] = {
+    "vga-6x60": (640, 480, 6, 60, 0.0, 0.0),
+    "vga-12x40": (640, 480, 12, 40, 0.0, 0.0),
+    "vga-6x60-noise": (640, 480, 6, 60, 4.0, 0.0),
+    "vga-6x60-blur": (640, 480, 6, 60, 0.0, 1.0),
+    "hd-20x50": (1280, 720, 20, 50, 0.0, 0.0),
+    "hd-12x80-noise": (1280, 720, 12, 80, 4.0, 0.0),
+    "hd-12x80-blur": (1280, 720, 12, 80, 0.0, 1.0),
+    "fhd-40x64": (1920, 1080, 40, 64, 0.0, 0.0),
+    "fhd-8x200": (1920, 1080, 8, 200, 0.0, 0.0),
+    "4k-100x80": (3840, 2160, 100, 80, 0.0, 0.0),
+    "4k-400x40": (3840, 2160, 400, 40, 0.0, 0.0),
+}
+
+SUITES: dict[str, tuple[str, ...]] = {
+    "quick": ("vga-6x60", "vga-6x60-noise", "hd-20x50", "file:341.png", "file:tops.png"),
+    "pyramid": ("hd-12x80-noise", "fhd-8x200", "4k-100x80", "file:tops.png"),
+    "full": tuple(SCENES) + tuple("file:" + name for name in sorted(os.listdir(IMAGES))),
+}
+
+
+def buildCase(name: str, seed: int = 0) -> tuple[Image.Image, list | None]:
+    """Returns the image of a case and its placed codes (None for files)"""
+    if name.startswith("file:"):
+        with Image.open(os.path.join(IMAGES, name[5:])) as im:
+            return im.convert("RGB"), None
+    width, height, count, diameter, noise, blur = SCENES[name]
+    codes = synthetic.placeCodes(count, diameter, width, height, seed)
+    return synthetic.scene(width, height, codes, noise, blur, seed), codes
+
+
+def detected(placed: list, found: list) -> int:
+    """Counts placed codes found with the same id within their bullseye"""
+    hits: int = 0
+    for code in placed:
+        r: float = code.diameter / 8
+        if any(f.code == code.code and (f.x - code.x) ** 2 + (f.y - code.y) ** 2 <= r * r for f in found):
+            hits += 1
+    return hits
+
+
+def measure(name: str, engine: str, repeat: int = 3, seed: int = 0) -> dict:
+    """Scans one case repeat times (after a warm up scan) with the engine"""
+    image, placed = buildCase(name, seed)
+    engine, _, mode = engine.partition("+")
+    scanner = Scanner(engine)
+    if mode == "pyramid":
+        scanner.setMinCodeDiameter(0.8 * SCENES[name][3] if name in SCENES else FILE_DIAMETER)
+    elif mode:
+        raise ValueError("unknown scan mode: " + mode)
+    found = scanner.scan_image(image)
+
+    recorder = Recorder()
+    scanner.setProbe(recorder)
+    frames: dict[str, list[float]] = {stage: [] for stage in STAGES}
+    for _ in range(repeat):
+        recorder.reset()
+        scanner.scan_image(image)
+        for stage in STAGES:
+            frames[stage].append(recorder.total(stage))
+    counters = recorder.counters
+    scanner.setProbe(None)
+
+    # reused buffers were allocated before tracing, they count in full
+    tracemalloc.start()
+    scanner.scan_image(image)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    peak += scanner.residentBytes
+
+    frame: float = statistics.median(frames["frame"])
+    megapixels: float = image.width * image.height / 1e6
+    result = {
+        "width": image.width,
+        "height": image.height,
+        "latency": {stage: statistics.median(times) for stage, times in frames.items()},
+        "fps": 1000.0 / frame if frame > 0 else 0.0,
+        "mpps": megapixels * 1000.0 / frame if frame > 0 else 0.0,
+        "peak_mb": peak / 1e6,
+        "found": len(found),
+        "ccount": counters.get("ccount", 0),
+        "tcount": counters.get("tcount", 0),
+    }
+    if placed is not None:
+        result["placed"] = len(placed)
+        result["detection"] = detected(placed, found) / len(placed) if placed else 1.0
+    if mode:
+        full = Scanner(engine).scan_image(image)
+        result["agreement"] = detected(full, found) / len(full) if full else 1.0
+    return result
+
+
+def run(names: Iterable[str], engines: Iterable[str] = ("array",), repeat: int = 3, log: TextIO | None = None) -> dict:
+    """Measures every case with every engine, keyed "engine/case" """
+    results: dict[str, dict] = {}
+    for engine in engines:
+        for name in names:
+            key = engine + "/" + name
+            start = T.perf_counter()
+            results[key] = measure(name, engine, repeat)
+            if log is not None:
+                r = results[key]
+                print(
+                    "%-32s %8.1f ms %7.1f fps %7.1f MB found %d%s (%.1f s)"
+                    % (
+                        key,
+                        r["latency"]["frame"],
+                        r["fps"],
+                        r["peak_mb"],
+                        r["found"],
+                        " of %d" % r["placed"] if "placed" in r else "",
+                        T.perf_counter() - start,
+                    ),
+                    file=log,
+                )
+    return {
+        "machine": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+        },
+        "repeat": repeat,
+        "results": results,
+    }
+
+
+def compare(current: dict, baseline: dict, tolerance: float = 0.25, slack: float = 2.0) -> list[str]:
+    """
+    Returns the regressions of current against baseline. A stage
+    regresses if it is more than tolerance (relative) and slack
+    (milliseconds) slower, memory if it grows by more than tolerance,
+    detection if fewer codes are found. Cases missing on either side
+    are ignored.
+    """
+    regressions: list[str] = []
+    for key, new in current["results"].items():
+        old = baseline["results"].get(key)
+        if old is None:
+            continue
+        for stage, ms in new["latency"].items():
+            before = old["latency"].get(stage)
+            if before is not None and ms > before * (1 + tolerance) + slack:
+                regressions.append("%s: %s %.1f ms, was %.1f ms" % (key, stage, ms, before))
+        if new["peak_mb"] > old["peak_mb"] * (1 + tolerance):
+            regressions.append("%s: peak memory %.1f MB, was %.1f MB" % (key, new["peak_mb"], old["peak_mb"]))
+        if new.get("detection", 1.0) < old.get("detection", 1.0):
+            regressions.append("%s: detection %.3f, was %.3f" % (key, new["detection"], old["detection"]))
+        if new.get("agreement", 1.0) < old.get("agreement", 1.0):
+            regressions.append("%s: agreement %.3f, was %.3f" % (key, new["agreement"], old["agreement"]))
+        if new["found"] < old["found"]:
+            regressions.append("%s: found %d codes, was %d" % (key, new["found"], old["found"]))
+    return regressions
+
+
+def main(
+    suite: str = "quick",
+    engines: Iterable[str] = ("array",),
+    repeat: int = 3,
+    out: str | None = None,
+    baseline: str | None = None,
+    tolerance: float = 0.25,
+    save: bool = False,
+) -> int:
+    """
+    Runs a suite, writes the results (to out, or stdout) and checks them
+    against the baseline file. With save the results replace the
+    baseline instead. Returns 1 on regressions.
+    """
+    results = run(SUITES[suite], engines, repeat, sys.stderr)
+    text = json.dumps(results, indent=1)
+    if out:
+        with open(out, "w") as f:
+            f.write(text + "\n")
+    elif not baseline:
+        print(text)
+
+    if baseline and save:
+        with open(baseline, "w") as f:
+            f.write(text + "\n")
+    elif baseline:
+        with open(baseline) as f:
+            regressions = compare(results, json.load(f), tolerance)
+        for regression in regressions:
+            print("REGRESSION " + regression, file=sys.stderr)
+        if regressions:
+            return 1
+        print("no regressions against " + baseline, file=sys.stderr)
+    return 0
@@ -0,0 +1,47 @@
+"""
+Working buffers that are reused from frame to frame.
+
+Every large array of a scan (gray plane, running sums, binary and
+candidate planes, ...) is asked for by name. As long as consecutive
+frames have the same size the same memory is handed out again, so
+scanning a video feed doesn't allocate and free a few hundred
+megabytes per frame. An array is only valid until its name is asked
+for again, the next frame overwrites it.
+
+python version by PapstJL4U
+"""
+import numpy as np
+
+
+class Buffers(object):
+    __slots__ = ("_arrays",)
+
+    # array per name
+    _arrays: dict[str, np.ndarray]
+
+    def __init__(self):
+        self._arrays = {}
+
+    def get(self, name: str, shape: tuple[int, ...], dtype) -> np.ndarray:
+        """
+        Returns the uninitialised array of the given name, shape and
+        dtype, the one of the last call if they are the same
+        """
+        array = self._arrays.get(name)
+        if array is None or array.shape != shape or array.dtype != dtype:
+            array = np.empty(shape, dtype=dtype)
+            self._arrays[name] = array
+        return array
+
+    def clear(self) -> None:
+        """Releases all buffers"""
+        self._arrays = {}
+
+    @property
+    def nbytes(self) -> int:
+        """Returns the bytes held by all buffers"""
+        return sum(array.nbytes for array in self._arrays.values())
+
+    def owns(self, array: np.ndarray) -> bool:
+        """Returns true if array is (a view of) one of the buffers"""
+        return any(np.shares_memory(array, own) for own in self._arrays.values())
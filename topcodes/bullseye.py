@@ -0,0 +1,149 @@
+"""
+Finds bullseye candidates in thresholded image data.
+
+Every row is walked in the same serpentine order as the threshold
+(left-2-right on even rows, right-2-left on odd rows). A sequence of
+black, white, black runs followed by white, whose lengths meet certain
+ratio constraints, could be the center of a TopCode. The center pixel
+and its left and right neighbours are marked as candidates.
+
+Instead of a state machine per pixel, the rows are run-length encoded
+and the constraints are checked for all runs at once.
+
+python version by PapstJL4U
+"""
+from buffers import Buffers
+import numpy as np
+
+# 8-connected neighbourhood of a pixel
+_NEIGHBOURS: tuple[tuple[int, int], ...] = ((-1, -1), (0, -1), (1, -1), (-1, 0), (1, 0), (-1, 1), (0, 1), (1, 1))
+
+
+def runs(
+    bw: np.ndarray, odd: bool = False, buffers: Buffers | None = None
+) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Run-length encoding of the serpentine walk of a binary plane.
+    Returns row, start (along the walk), length and value of every run.
+    With odd=True the first row is an odd row of the image.
+    """
+    buffers = buffers or Buffers()
+    height, width = bw.shape
+    path = buffers.get("bullseye.path", (height, width), np.uint8)
+    mirrored: int = 0 if odd else 1
+    path[1 - mirrored :: 2] = bw[1 - mirrored :: 2]
+    path[mirrored::2] = bw[mirrored::2, ::-1]
+
+    first = buffers.get("bullseye.first", (height, width), np.bool_)
+    first[:, 0] = True
+    np.not_equal(path[:, 1:], path[:, :-1], out=first[:, 1:])
+    idx = np.flatnonzero(first)
+
+    row = idx // width
+    start = idx - row * width
+    end = np.empty_like(start)
+    end[:-1] = start[1:]
+    # the last run of each row ends with the row
+    last = np.empty(idx.size, dtype=bool)
+    last[:-1] = row[1:] != row[:-1]
+    last[-1:] = True
+    end[last] = width
+    return row, start, end - start, path.ravel()[idx]
+
+
+def candidates(
+    bw: np.ndarray, maxu: int, odd: bool = False, buffers: Buffers | None = None
+) -> tuple[np.ndarray, int]:
+    """
+    Marks candidate TopCode centers of a binary plane (0 black, 1 white).
+    maxu is the maximum width of a topcode unit in pixels, odd tells if
+    the first row is an odd row of the image (for bands of rows).
+    Returns the candidate mask and the candidate count (3 per match).
+    With buffers the mask is a reused buffer.
+    """
+    buffers = buffers or Buffers()
+    height, width = bw.shape
+    mask = buffers.get("bullseye.mask", (height, width), np.uint8)
+    mask.fill(0)
+    row, start, length, value = runs(bw, odd, buffers)
+    if row.size < 4:
+        return mask, 0
+
+    # black, white, black, white runs in the same row
+    t = np.flatnonzero((value[:-3] == 0) & (row[:-3] == row[3:]))
+    b1 = length[t]
+    w1 = length[t + 1]
+    b2 = length[t + 2]
+    bb = b1 + b2
+    ok = (
+        (b1 >= 2)
+        & (b2 >= 2)
+        & (b1 <= maxu)
+        & (b2 <= maxu)
+        & (w1 <= (maxu + maxu))
+        & (np.abs(bb - w1) <= bb)
+        & (np.abs(bb - w1) <= w1)
+        & (np.abs(b1 - b2) <= b1)
+        & (np.abs(b1 - b2) <= b2)
+    )
+    t = t[ok]
+
+    # step back from the first pixel of the last white run
+    pos = start[t + 3] - 1 - b1[ok] - w1[ok] // 2
+    y = row[t]
+    x = np.where((y + odd) % 2 == 0, pos, width - 1 - pos)
+    mask[y, x - 1] = 1
+    mask[y, x] = 1
+    mask[y, x + 1] = 1
+    return mask, 3 * t.size
+
+
+def centers(cand: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Returns x and y (raster order) of the candidates whose left, right,
+    upper and lower neighbours are candidates as well
+    """
+    test = cand[2:-2, 1:-1] & cand[2:-2, :-2] & cand[2:-2, 2:] & cand[1:-3, 1:-1] & cand[3:-1, 1:-1]
+    ys, xs = np.nonzero(test)
+    return xs + 1, ys + 2
+
+
+def clusters(xs: np.ndarray, ys: np.ndarray) -> list[tuple[int, float, float, int, list[tuple[int, int]]]]:
+    """
+    Groups candidate points into 8-connected clusters, one per bullseye.
+    Points must be in raster order. Returns the index of the first
+    point, the centroid (x, y), the size and the points of every
+    cluster, in the order of their first points.
+    """
+    points: dict[tuple[int, int], int] = {p: k for k, p in enumerate(zip(xs.tolist(), ys.tolist()))}
+    result: list[tuple[int, float, float, int, list[tuple[int, int]]]] = []
+    for (x, y), first in list(points.items()):
+        if (x, y) not in points:
+            continue
+        del points[(x, y)]
+        stack = [(x, y)]
+        members: list[tuple[int, int]] = []
+        sx, sy, size = 0, 0, 0
+        while stack:
+            px, py = stack.pop()
+            members.append((px, py))
+            sx += px
+            sy += py
+            size += 1
+            for dx, dy in _NEIGHBOURS:
+                q = (px + dx, py + dy)
+                if q in points:
+                    del points[q]
+                    stack.append(q)
+        result.append((first, sx / size, sy / size, size, members))
+    return result
+
+
+def nearest(members: list[tuple[int, int]], cx: float, cy: float) -> list[tuple[int, int]]:
+    """
+    Points of a cluster next to its rounded centroid (cx, cy), at most
+    the 8 around it, nearest to the centroid first
+    """
+    i, j = round(cx), round(cy)
+    dist = lambda p: (p[0] - cx) * (p[0] - cx) + (p[1] - cy) * (p[1] - cy)
+    return sorted((p for p in members if p != (i, j) and abs(p[0] - i) <= 1 and abs(p[1] - j) <= 1), key=dist)
@@ -0,0 +1,314 @@
+"""
+Instrumentation for the scanner: stage timers, counters, latency
+histograms across frames and trace export.
+
+The Scanner reports to a Probe. The default Probe does nothing, its
+methods are empty and the scanner doesn't even read the clock, so
+instrumentation costs close to nothing when it is not used.
+A Recorder collects everything:
+
+    recorder = Recorder(trace=True)
+    scanner.setProbe(recorder)
+    scanner.scan_by_filename("tops.png")
+    recorder.summary()
+    recorder.writeChromeTrace("scan.json")   # chrome://tracing, perfetto
+    recorder.writeSpeedscope("scan.speedscope.json")
+
+Work in other processes (scan_tiled, RawSequence.scan with jobs > 1)
+reports to a fork of the probe that travels there and back, and is
+merged into the probe when its results arrive.
+
+Stage names used by the scanner:
+    frame, ingest, threshold, candidates, find,
+    decode, decode.locate, decode.unit, decode.read
+Counters:
+    ccount, tcount, decode.valid, decode.invalid, readCode,
+    decode.early (accepted at the first arc, see setConfidenceThreshold)
+    and where invalid candidates were rejected: decode.reject.lost,
+    decode.reject.symmetry, decode.reject.unit, decode.reject.core,
+    decode.reject.read
+
+python version by PapstJL4U
+"""
+from collections import deque
+import json as json
+import math as math
+import os as os
+import threading as threading
+import time as T
+
+
+class Probe(object):
+    """Receives measurements from the scanner and drops them"""
+
+    def start(self, stage: str) -> int:
+        """Called when a stage begins, returns the start time"""
+        return 0
+
+    def stop(self, stage: str, start: int) -> None:
+        """Called when a stage ends with the value returned by start"""
+        pass
+
+    def count(self, name: str, n: int = 1) -> None:
+        """Adds n to a counter"""
+        pass
+
+    def frame(self) -> None:
+        """Called after every scanned frame"""
+        pass
+
+    def fork(self) -> "Probe":
+        """Returns an empty probe for work in another process, see merge"""
+        return self
+
+    def merge(self, other: "Probe") -> None:
+        """Adds the measurements of a fork"""
+        pass
+
+
+# shared probe of all scanners without instrumentation
+NULL_PROBE: Probe = Probe()
+
+
+class Histogram(object):
+    """
+    Latency histogram with logarithmic buckets (4 per octave) from
+    1 microsecond upwards. Memory doesn't grow with the number of values.
+    """
+
+    # buckets per doubling of the latency
+    _steps: int = 4
+
+    def __init__(self):
+        self._buckets: dict[int, int] = {}
+        self._count: int = 0
+        self._total: float = 0.0
+        self._max: float = 0.0
+
+    def add(self, ms: float) -> None:
+        bucket: int = max(0, math.ceil(self._steps * math.log2(max(ms * 1000.0, 1.0))))
+        self._buckets[bucket] = self._buckets.get(bucket, 0) + 1
+        self._count += 1
+        self._total += ms
+        self._max = max(self._max, ms)
+
+    @property
+    def count(self) -> int:
+        return self._count
+
+    @property
+    def mean(self) -> float:
+        """Returns the mean latency in milliseconds"""
+        return self._total / self._count if self._count else 0.0
+
+    @property
+    def max(self) -> float:
+        """Returns the highest latency in milliseconds"""
+        return self._max
+
+    def merge(self, other: "Histogram") -> None:
+        """Adds the values of another histogram"""
+        for bucket, n in other._buckets.items():
+            self._buckets[bucket] = self._buckets.get(bucket, 0) + n
+        self._count += other._count
+        self._total += other._total
+        self._max = max(self._max, other._max)
+
+    def percentile(self, p: float) -> float:
+        """Upper bound of the bucket holding the p-th percentile, in milliseconds"""
+        if not self._count:
+            return 0.0
+        rank: float = self._count * p / 100.0
+        seen: int = 0
+        for bucket in sorted(self._buckets):
+            seen += self._buckets[bucket]
+            if seen >= rank:
+                return min(self._max, 2 ** (bucket / self._steps) / 1000.0)
+        return self._max
+
+    def summary(self) -> dict:
+        return {
+            "count": self._count,
+            "mean": self.mean,
+            "p50": self.percentile(50),
+            "p90": self.percentile(90),
+            "p99": self.percentile(99),
+            "max": self._max,
+        }
+
+
+class Recorder(Probe):
+    """
+    Collects stage timers, counters and per-frame latency histograms.
+    With trace=True every stage is also kept as a trace event (the
+    newest max_events of them) for Chrome trace or speedscope export.
+    Safe to share between the threads of Scanner.stream, and can be
+    pickled for other processes (without the lock, a copy gets its own).
+    """
+
+    def __init__(self, trace: bool = False, max_events: int = 1000000):
+        self._lock = threading.Lock()
+        self._trace: bool = trace
+        self._events: deque = deque(maxlen=max_events)
+        self._origin: int = T.perf_counter_ns()
+        self.reset()
+
+    def reset(self) -> None:
+        """Forgets all measurements"""
+        with self._lock:
+            # total milliseconds and calls per stage
+            self._totals: dict[str, float] = {}
+            self._calls: dict[str, int] = {}
+            self._counters: dict[str, int] = {}
+            # milliseconds per stage within the current frame
+            self._frame: dict[str, float] = {}
+            self._histograms: dict[str, Histogram] = {}
+            self._frames: int = 0
+            self._events.clear()
+
+    def __getstate__(self) -> dict:
+        state = dict(self.__dict__)
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def start(self, stage: str) -> int:
+        return T.perf_counter_ns()
+
+    def stop(self, stage: str, start: int) -> None:
+        end: int = T.perf_counter_ns()
+        ms: float = (end - start) / 1e6
+        with self._lock:
+            self._totals[stage] = self._totals.get(stage, 0.0) + ms
+            self._calls[stage] = self._calls.get(stage, 0) + 1
+            self._frame[stage] = self._frame.get(stage, 0.0) + ms
+            if self._trace:
+                self._events.append((stage, start - self._origin, end - start, threading.get_ident()))
+
+    def count(self, name: str, n: int = 1) -> None:
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + n
+
+    def frame(self) -> None:
+        with self._lock:
+            for stage, ms in self._frame.items():
+                self._histograms.setdefault(stage, Histogram()).add(ms)
+            self._frame = {}
+            self._frames += 1
+
+    def fork(self) -> "Recorder":
+        # same origin, trace events of all processes share one time line
+        fork = Recorder(self._trace, self._events.maxlen)
+        fork._origin = self._origin
+        return fork
+
+    def merge(self, other: Probe) -> None:
+        if not isinstance(other, Recorder) or other is self:
+            return
+        with self._lock:
+            for stage, ms in other._totals.items():
+                self._totals[stage] = self._totals.get(stage, 0.0) + ms
+                self._calls[stage] = self._calls.get(stage, 0) + other._calls[stage]
+            for name, n in other._counters.items():
+                self._counters[name] = self._counters.get(name, 0) + n
+            # stages of an unfinished frame of the fork belong to the current frame
+            for stage, ms in other._frame.items():
+                self._frame[stage] = self._frame.get(stage, 0.0) + ms
+            for stage, histogram in other._histograms.items():
+                self._histograms.setdefault(stage, Histogram()).merge(histogram)
+            self._frames += other._frames
+            self._events.extend(other._events)
+
+    @property
+    def frames(self) -> int:
+        """Returns the number of frames recorded"""
+        return self._frames
+
+    @property
+    def counters(self) -> dict[str, int]:
+        return dict(self._counters)
+
+    def total(self, stage: str) -> float:
+        """Returns the milliseconds spent in a stage over all frames"""
+        return self._totals.get(stage, 0.0)
+
+    def histogram(self, stage: str) -> Histogram:
+        """Returns the per-frame latency histogram of a stage"""
+        return self._histograms.get(stage, Histogram())
+
+    def summary(self) -> dict:
+        """All measurements as a JSON friendly dictionary"""
+        with self._lock:
+            return {
+                "frames": self._frames,
+                "counters": dict(self._counters),
+                "stages": {
+                    stage: {
+                        "calls": self._calls[stage],
+                        "total": self._totals[stage],
+                        "frames": self._histograms[stage].summary() if stage in self._histograms else None,
+                    }
+                    for stage in self._totals
+                },
+            }
+
+    def chromeTrace(self) -> dict:
+        """Trace events in the Chrome trace event format"""
+        pid: int = os.getpid()
+        return {
+            "displayTimeUnit": "ms",
+            "traceEvents": [
+                {"name": stage, "ph": "X", "ts": start / 1000.0, "dur": duration / 1000.0, "pid": pid, "tid": tid}
+                for stage, start, duration, tid in list(self._events)
+            ],
+        }
+
+    def speedscope(self) -> dict:
+        """Trace events as speedscope evented profiles, one per thread"""
+        names: dict[str, int] = {}
+        threads: dict[int, list[tuple[int, int, int]]] = {}
+        for stage, start, duration, tid in list(self._events):
+            frame = names.setdefault(stage, len(names))
+            threads.setdefault(tid, []).append((start, start + duration, frame))
+
+        profiles = []
+        for tid, spans in threads.items():
+            # outer stages first when they start at the same time
+            spans.sort(key=lambda s: (s[0], -s[1]))
+            events = []
+            open_spans: list[tuple[int, int, int]] = []
+            for span in spans:
+                while open_spans and open_spans[-1][1] <= span[0]:
+                    done = open_spans.pop()
+                    events.append({"type": "C", "frame": done[2], "at": done[1] / 1000.0})
+                events.append({"type": "O", "frame": span[2], "at": span[0] / 1000.0})
+                open_spans.append(span)
+            while open_spans:
+                done = open_spans.pop()
+                events.append({"type": "C", "frame": done[2], "at": done[1] / 1000.0})
+            profiles.append(
+                {
+                    "type": "evented",
+                    "name": "thread " + str(tid),
+                    "unit": "microseconds",
+                    "startValue": spans[0][0] / 1000.0,
+                    "endValue": events[-1]["at"],
+                    "events": events,
+                }
+            )
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "shared": {"frames": [{"name": name} for name in names]},
+            "profiles": profiles,
+        }
+
+    def writeChromeTrace(self, filename: str) -> None:
+        with open(filename, "w") as f:
+            json.dump(self.chromeTrace(), f)
+
+    def writeSpeedscope(self, filename: str) -> None:
+        with open(filename, "w") as f:
+            json.dump(self.speedscope(), f)
@@ -0,0 +1,177 @@
+"""
+Streams frames through the scanner in stages.
+
+Ingest, thresholding and decoding of consecutive frames run in their
+own worker threads, connected by bounded queues. While one frame is
+decoded, the next one is already thresholded and a third one ingested.
+numpy releases the GIL for the array stages, so the stages really
+overlap. Results come out in frame order.
+
+A scanner with a region of interest, a minimum code diameter or its own
+_scan_gray (like the TrackingScanner) thresholds its own windows. Its
+frames skip the threshold stage and are scanned as a whole in the
+decode stage, with the same results as scan_image.
+
+With latest=True a slow consumer never builds up a backlog: when the
+input queue is full the oldest waiting frame is dropped in favour of
+the newest one (like a camera preview would do). That is meant for
+live sources that deliver frames at their own pace. A source that has
+its frames at hand (a list, a file) outruns every stage: of 30 frames
+in a list only about the last depth ones are scanned, the others are
+dropped even though the stages are idle.
+
+Closing the stream stops the stages and returns once they are done.
+The thread pulling frames from the source is not waited for, it may
+be blocked until the source delivers its next frame (a camera) and
+ends there.
+
+python version by PapstJL4U
+"""
+from typing import Iterable, Iterator, TYPE_CHECKING
+from topcode import TopCode
+import queue as queue
+import threading as threading
+
+if TYPE_CHECKING:
+    from scanner import Scanner
+
+# marks the end of the frame stream
+_DONE = object()
+
+
+class _Failed(object):
+    """Carries an exception of a stage down to the consumer"""
+
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+class FramePipeline(object):
+    # scanner that decodes and whose settings all stages use
+    _scanner: "Scanner"
+    # number of frames each queue holds
+    _depth: int = 2
+    # drop the oldest waiting frame instead of blocking the source
+    _latest: bool = False
+    # frames dropped so far
+    _dropped: int = 0
+
+    def __init__(self, scanner: "Scanner", depth: int = 2, latest: bool = False):
+        if depth < 1:
+            raise ValueError("depth must be at least 1")
+        self._scanner = scanner
+        self._depth = depth
+        self._latest = latest
+        self._dropped = 0
+        self._stop = threading.Event()
+
+    @property
+    def dropped(self) -> int:
+        """Returns the number of frames dropped by the latest-frame policy"""
+        return self._dropped
+
+    def run(self, frames: Iterable) -> Iterator[tuple[int, list[TopCode]]]:
+        """
+        Scans every frame (Pillow image or numpy array) and yields
+        (frame index, topcodes) in frame order. Dropped frames are
+        skipped, their index is missing from the results.
+        """
+        # their planes are handed on while the next frame comes in,
+        # so these stages can't reuse their buffers
+        ingest = self._scanner._stage()
+        ingest.setBufferReuse(False)
+        threshold = self._scanner._stage()
+        threshold.setBufferReuse(False)
+        decode = self._scanner
+        # otherwise the decode stage thresholds its own windows
+        whole: bool = decode._wholeFrame()
+        queues = [queue.Queue(self._depth) for _ in range(4)]
+
+        def ingestFrame(index, frame):
+            return index, ingest._ingest(frame)
+
+        def thresholdFrame(index, gray):
+            if not whole:
+                return index, gray, None, None, 0
+            threshold._prepare(gray)
+            return index, gray, threshold._bw, threshold._cand, threshold._ccount
+
+        def decodeFrame(index, gray, bw, cand, ccount):
+            if whole:
+                decode._setPlanes(gray, bw, cand, ccount)
+                codes = decode._findCodes()
+            else:
+                codes = decode._scan_frame(gray)
+            decode.probe.frame()
+            return index, decode._result(codes)
+
+        threads = [
+            threading.Thread(target=self._feed, args=(frames, queues[0]), daemon=True),
+            threading.Thread(target=self._work, args=(ingestFrame, queues[0], queues[1]), daemon=True),
+            threading.Thread(target=self._work, args=(thresholdFrame, queues[1], queues[2]), daemon=True),
+            threading.Thread(target=self._work, args=(decodeFrame, queues[2], queues[3]), daemon=True),
+        ]
+        for thread in threads:
+            thread.start()
+        try:
+            while True:
+                item = queues[3].get()
+                if item is _DONE:
+                    break
+                if isinstance(item, _Failed):
+                    raise item.error
+                yield item
+        finally:
+            self._stop.set()
+            # the feeder (threads[0]) may wait for the source, it ends at its next frame
+            for thread in threads[1:]:
+                thread.join()
+
+    def _put(self, sink: queue.Queue, item: object) -> None:
+        """Blocking put that gives up once the pipeline is stopped"""
+        while not self._stop.is_set():
+            try:
+                sink.put(item, timeout=0.05)
+                return
+            except queue.Full:
+                continue
+
+    def _feed(self, frames: Iterable, sink: queue.Queue) -> None:
+        """Pulls frames from the source as fast as it delivers them"""
+        try:
+            for index, frame in enumerate(frames):
+                if self._stop.is_set():
+                    return
+                if not self._latest:
+                    self._put(sink, (index, frame))
+                    continue
+                while True:
+                    try:
+                        sink.put_nowait((index, frame))
+                        break
+                    except queue.Full:
+                        try:
+                            sink.get_nowait()
+                            self._dropped += 1
+                        except queue.Empty:
+                            pass
+        except BaseException as error:
+            self._put(sink, _Failed(error))
+            return
+        self._put(sink, _DONE)
+
+    def _work(self, work, source: queue.Queue, sink: queue.Queue) -> None:
+        """Runs one stage until the end of the stream or a failure"""
+        while not self._stop.is_set():
+            try:
+                item = source.get(timeout=0.05)
+            except queue.Empty:
+                continue
+            if item is _DONE or isinstance(item, _Failed):
+                self._put(sink, item)
+                return
+            try:
+                self._put(sink, work(*item))
+            except BaseException as error:
+                self._put(sink, _Failed(error))
+                return
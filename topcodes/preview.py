@@ -0,0 +1,57 @@
+"""
+Debug images of the threshold, like the preview of the java scanner.
+
+The binary plane is turned into palette indices in one array operation
+and overlays are written into the same plane: candidate pixels, the
+candidate centers that were decoded and the outlines of the codes that
+were found. Pillow expands the palette to RGBA in C.
+
+python version by PapstJL4U
+"""
+from typing import Iterable
+from PIL import Image, ImageDraw
+import numpy as np
+
+# palette indices of the preview
+BLACK: int = 0
+WHITE: int = 1
+CANDIDATE: int = 2
+TESTED: int = 3
+OUTLINE: int = 4
+
+# ARGB colours of the palette indices, as in the java preview
+COLORS: tuple[int, ...] = (0xFF000000, 0xFFFFFFFF, 0xFF00FF00, 0xFFFF0000, 0xFF0000FF)
+
+_PALETTE: list[int] = [(color >> shift) & 0xFF for color in COLORS for shift in (16, 8, 0)]
+
+# 3x3 neighbourhood a tested center is painted with
+_SPOT = np.array([-1, 0, 1])
+
+
+def render(
+    bw: np.ndarray,
+    cand: np.ndarray | None = None,
+    tested: Iterable[tuple[int, int]] = (),
+    outlines: Iterable[tuple[float, float, float]] = (),
+) -> Image.Image:
+    """
+    Returns an RGBA image of the binary plane (black and white). Pixels
+    of the candidate plane are painted green, the tested candidate
+    centers (x, y) red and the outlines of codes (x, y, diameter) blue.
+    """
+    height, width = bw.shape
+    plane = np.array(bw, dtype=np.uint8)
+    if cand is not None:
+        np.putmask(plane, cand, CANDIDATE)
+    points = np.array(list(tested), dtype=np.intp).reshape(-1, 2)
+    if points.size:
+        xs = (points[:, 0, None, None] + _SPOT[None, None, :]).clip(0, width - 1)
+        ys = (points[:, 1, None, None] + _SPOT[None, :, None]).clip(0, height - 1)
+        plane[tuple(np.broadcast_arrays(ys, xs))] = TESTED
+    image = Image.fromarray(plane, mode="P")
+    image.putpalette(_PALETTE)
+    draw = ImageDraw.Draw(image)
+    for x, y, diameter in outlines:
+        r = diameter / 2
+        draw.ellipse((x - r, y - r, x + r, y + r), outline=OUTLINE)
+    return image.convert("RGBA")
@@ -0,0 +1,159 @@
+"""
+Coarse-to-fine scanning of large frames.
+
+If all codes are known to be large, the bullseye search doesn't need
+every pixel. The gray plane is shrunk by a power of two (block
+averages) so that the smallest code still has a unit of a few pixels,
+thresholded and searched for candidates there. Every candidate is
+centered and measured (xdist/ydist and readUnit) on the small image,
+which already rejects most of the noise. Only small windows around the
+remaining candidates are thresholded at full resolution, where the
+candidate is decoded like in a full frame scan. The windows all have
+the same size, stacked on top of each other they are thresholded in
+a single pass. They start on even rows and have an even height (see
+windows). The maximum code diameter holds on both levels: the coarse
+search uses the shrunk unit limit, decoded codes with a larger unit
+are dropped.
+
+python version by PapstJL4U
+"""
+from typing import TYPE_CHECKING
+from topcode import TopCode
+import numpy as np
+import wellner
+import bullseye
+import spatial
+
+if TYPE_CHECKING:
+    from scanner import Scanner
+
+# smallest unit in pixels the bullseye search handles reliably
+MIN_UNIT: float = 3.0
+
+
+def factor(diameter: float) -> int:
+    """
+    Largest power of two the image can be shrunk by, such that codes of
+    the given diameter keep a unit of at least MIN_UNIT pixels
+    """
+    f: int = 1
+    while diameter / 8.0 / (f * 2) >= MIN_UNIT:
+        f *= 2
+    return f
+
+
+def downscale(gray: np.ndarray, f: int) -> np.ndarray:
+    """Averages f x f blocks, cut rows and columns at the border are dropped"""
+    height, width = gray.shape
+    h, w = height // f, width // f
+    summ = np.zeros((h, w), dtype=np.uint16 if f * f * 0xFF <= 0xFFFF else np.uint32)
+    for j in range(f):
+        for i in range(f):
+            summ += gray[j : h * f : f, i : w * f : f]
+    return (summ // (f * f)).astype(np.uint8)
+
+
+def windows(
+    centers: list[tuple[float, float]], r: int, width: int, height: int
+) -> tuple[int, int, list[tuple[int, int]]]:
+    """
+    Returns the size (wx, wy) and the corners (x0, y0) of the windows
+    that reach r pixels around the centers, clipped to the frame. The
+    height is even and windows start on even rows, so their serpentine
+    walk runs like the one of the frame, stacked or not (windows as high
+    as a frame of odd height leave out its last row).
+    """
+    side: int = 2 * r + 2
+    wx, wy = min(side, width), min(side, height & ~1)
+    corners: list[tuple[int, int]] = []
+    for x, y in centers:
+        x0 = min(max(0, round(x) - r), width - wx)
+        y0 = min(max(0, round(y) - r), height - wy) & ~1
+        corners.append((x0, y0))
+    return wx, wy, corners
+
+
+def scanPyramid(scanner: "Scanner", gray: np.ndarray, diameter: float) -> list[TopCode]:
+    """
+    Scans the gray plane for codes of at least diameter pixels. The
+    scanner ends up with the planes of the last full resolution window.
+    """
+    f: int = factor(diameter)
+    if f == 1 or min(gray.shape) < 8 * f:
+        scanner._prepare(gray)
+        return scanner._findCodes()
+    probe = scanner.probe
+    height, width = gray.shape
+
+    # coarse level: threshold, candidates and measurement
+    coarse = scanner._stage()
+    coarse._maxu = -(-scanner._maxu // f)
+    start = probe.start("pyramid.coarse")
+    coarse._prepare(downscale(gray, f))
+    xs, ys = bullseye.centers(coarse._cand)
+    spots: list[tuple[int, float, float, float]] = []
+    for first, cx, cy, _, _ in sorted(bullseye.clusters(xs, ys), key=lambda c: -c[3]):
+        spot = TopCode()
+        coarse._locate(spot, round(cx), round(cy))
+        if spot.unit > 0:
+            # centers of the f x f blocks at full resolution
+            spots.append((first, (spot.x + 0.5) * f - 0.5, (spot.y + 0.5) * f - 0.5, spot.unit * f))
+    probe.stop("pyramid.coarse", start)
+    probe.count("pyramid.candidates", len(spots))
+
+    if not spots:
+        scanner._tcount = 0
+        scanner._ccount = coarse.ccount
+        return []
+
+    # full resolution windows of one size, big enough for the largest
+    # symbol and a warm up, stacked into one plane and thresholded at once
+    # (the unit measured on the coarse level may be f pixels short)
+    r: int = spatial.margin(max(s[3] for s in spots) + f)
+    wx, wy, corners = windows([(x, y) for _, x, y, _ in spots], r, width, height)
+    stack = np.empty((len(spots) * wy, wx), dtype=np.uint8)
+    for k, (x0, y0) in enumerate(corners):
+        stack[k * wy : (k + 1) * wy] = gray[y0 : y0 + wy, x0 : x0 + wx]
+    start = probe.start("threshold")
+    bw, _ = wellner.threshold(stack)
+    probe.stop("threshold", start)
+    cand = np.zeros((wy, wx), dtype=np.uint8)
+
+    codes: list[tuple[int, TopCode]] = []
+    found = spatial.BullsEyeIndex()
+    rejected = spatial.BullsEyeIndex()
+    scanner._tcount = 0
+    for k, (first, x, y, _) in enumerate(spots):
+        i: int = round(x)
+        j: int = round(y)
+        if found.contains(i, j) or rejected.contains(i, j):
+            continue
+        x0, y0 = corners[k]
+        scanner._setPlanes(stack[k * wy : (k + 1) * wy], bw[k * wy : (k + 1) * wy], cand, 0)
+        scanner._tcount += 1
+        # the preview shows the window of the last candidate
+        scanner._tested.append((i - x0, j - y0))
+        spot = TopCode()
+        start = probe.start("decode")
+        scanner.decode(spot, i - x0, j - y0)
+        probe.stop("decode", start)
+        if spot.isValid and spot.unit > scanner._maxu:
+            # coarse runs of ceil(maxu / f) blocks allow up to f - 1 wider units
+            probe.count("decode.reject.unit")
+            spot.code = -1
+        if spot.isValid:
+            scanner._found.append((spot.x, spot.y, spot.diameter))
+        spot.setLocation(spot.x + x0, spot.y + y0)
+        if spot.isValid:
+            probe.count("decode.valid")
+            codes.append((first, spot))
+            found.add(spot, spot.diameter / 2)
+        else:
+            probe.count("decode.invalid")
+            region = TopCode()
+            region.setLocation(i, j)
+            rejected.add(region, max(2.0, spot.unit))
+    probe.count("tcount", scanner._tcount)
+    scanner._ccount = coarse.ccount
+    # report codes in scan order of the coarse level
+    return [code for _, code in sorted(codes, key=lambda c: c[0])]
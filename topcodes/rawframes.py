@@ -0,0 +1,267 @@
+"""
+Raw pixel buffers as handed over by cameras and capture processes.
+
+A buffer is anything with the buffer protocol (bytes, bytearray,
+memoryview, array.array, mmap) or a numpy array. It is looked at
+through numpy views, so the pixels are not copied unless the format
+needs arithmetic (the intensity of colour pixels). Gray and YUYV
+frames are scanned straight from the buffer.
+
+Formats (bytes per pixel):
+    argb   packed 0xAARRGGBB integers in native byte order (4),
+           the java scan(int[], w, h)
+    gray8  one intensity byte (1)
+    rgb24  r, g, b bytes (3)
+    bgr24  b, g, r bytes (3)
+    yuyv   y0 u y1 v for two pixels (2), the luma is the intensity
+
+Recorded sessions are replayed from raw sequence files: frames of one
+size back to back, optionally behind a one line header. RawSequence
+memory maps them and hands every frame to the scanner as a view.
+
+python version by PapstJL4U
+"""
+from typing import TYPE_CHECKING, Iterable, Iterator
+from PIL import Image
+from topcode import TopCode
+from buffers import Buffers
+import numpy as np
+import multiprocessing as multiprocessing
+import os as os
+import sys as sys
+
+if TYPE_CHECKING:
+    from scanner import Scanner
+    from instrument import Probe
+
+# bytes per pixel of every format
+FORMATS: dict[str, int] = {"argb": 4, "gray8": 1, "rgb24": 3, "bgr24": 3, "yuyv": 2}
+
+# byte offsets of r, g, b within a packed ARGB integer in memory
+_ARGB_RGB: tuple[int, int, int] = (2, 1, 0) if sys.byteorder == "little" else (1, 2, 3)
+
+
+def pixels(buffer, width: int, height: int, format: str = "argb", stride: int | None = None) -> np.ndarray:
+    """
+    Returns a read only (height, width, bytes per pixel) uint8 view of
+    the buffer. stride is the number of bytes per row (default: no
+    padding). numpy arrays of 2 or more dimensions keep their own strides.
+    ARGB pixels in lists and integer arrays other than 32 bit are packed
+    into uint32 first (stride counts bytes of those), other formats take
+    lists as byte values.
+    """
+    if format not in FORMATS:
+        raise ValueError("unknown pixel format: " + str(format))
+    bpp: int = FORMATS[format]
+    if isinstance(buffer, list):
+        buffer = np.asarray(buffer, dtype=np.int64 if format == "argb" else np.uint8)
+    if format == "argb" and isinstance(buffer, np.ndarray) and buffer.dtype != np.uint8:
+        if buffer.dtype.kind not in "iu":
+            raise ValueError("ARGB pixels must be integers, not " + str(buffer.dtype))
+        if buffer.dtype.itemsize != 4:
+            # java style int[], signed values wrap to ARGB
+            buffer = buffer.astype(np.uint32)
+    if isinstance(buffer, np.ndarray) and buffer.ndim >= 2:
+        if buffer.shape[0] != height:
+            raise ValueError("frame has %d rows, expected %d" % (buffer.shape[0], height))
+        rows = buffer.view(np.uint8).reshape(height, -1) if buffer.dtype != np.uint8 else buffer.reshape(height, -1)
+    else:
+        flat = np.frombuffer(buffer, dtype=np.uint8) if not isinstance(buffer, np.ndarray) else buffer.view(np.uint8)
+        step: int = stride or width * bpp
+        if step < width * bpp or flat.size < step * (height - 1) + width * bpp:
+            raise ValueError("buffer too small for %dx%d %s" % (width, height, format))
+        rows = np.lib.stride_tricks.as_strided(flat, shape=(height, step), strides=(step, 1), writeable=False)
+    if rows.shape[1] < width * bpp:
+        raise ValueError("rows too short for %d %s pixels" % (width, format))
+    view = rows[:, : width * bpp].reshape(height, width, bpp)
+    if view.flags.writeable:
+        view = view.view()
+        view.flags.writeable = False
+    return view
+
+
+def average(view: np.ndarray, channels: tuple[int, ...] = (0, 1, 2), buffers: Buffers | None = None) -> np.ndarray:
+    """
+    Intensity (r + g + b) // 3 of a (height, width, bytes) uint8 view,
+    channels are the r, g and b byte offsets. With buffers the plane
+    is a reused buffer.
+    """
+    buffers = buffers or Buffers()
+    shape = view.shape[:2]
+    summ = buffers.get("ingest.sum", shape, np.uint16)
+    np.add(view[:, :, channels[0]], view[:, :, channels[1]], out=summ, dtype=np.uint16)
+    summ += view[:, :, channels[2]]
+    summ //= 3
+    plane = buffers.get("ingest.gray", shape, np.uint8)
+    np.copyto(plane, summ, casting="unsafe")
+    return plane
+
+
+def gray(
+    buffer, width: int, height: int, format: str = "argb", stride: int | None = None, buffers: Buffers | None = None
+) -> np.ndarray:
+    """
+    Returns the (height, width) uint8 intensity plane of the buffer:
+    (r + g + b) // 3 like Scanner._ingest, the luma for YUYV.
+    gray8 and YUYV planes are views of the buffer, colour planes come
+    from buffers if given.
+    """
+    view = pixels(buffer, width, height, format, stride)
+    if format in ("gray8", "yuyv"):
+        return view[:, :, 0]
+    return average(view, _ARGB_RGB if format == "argb" else (0, 1, 2), buffers)
+
+
+def toImage(buffer, width: int, height: int, format: str = "argb", stride: int | None = None) -> Image.Image:
+    """Copies the buffer into a Pillow image (L for gray and YUYV)"""
+    view = pixels(buffer, width, height, format, stride)
+    if format in ("gray8", "yuyv"):
+        return Image.fromarray(np.ascontiguousarray(view[:, :, 0]), mode="L")
+    if format == "argb":
+        r, g, b = _ARGB_RGB
+        a = 3 if sys.byteorder == "little" else 0
+        return Image.fromarray(np.ascontiguousarray(view[:, :, [r, g, b, a]]), mode="RGBA")
+    order = [0, 1, 2] if format == "rgb24" else [2, 1, 0]
+    return Image.fromarray(np.ascontiguousarray(view[:, :, order]), mode="RGB")
+
+
+# first bytes of a raw sequence file with header
+MAGIC: bytes = b"TOPCODES-RAW"
+
+
+def writeSequence(filename: str, frames: Iterable[np.ndarray], format: str = "gray8") -> int:
+    """
+    Writes frames (uint8 arrays of one size, (h, w) or (h, w, bytes per
+    pixel)) to a raw sequence file with a one line header
+    "TOPCODES-RAW <format> <width> <height>". Returns the frame count.
+    """
+    if format not in FORMATS:
+        raise ValueError("unknown pixel format: " + str(format))
+    written: int = 0
+    with open(filename, "wb") as f:
+        for frame in frames:
+            frame = np.ascontiguousarray(frame, dtype=np.uint8)
+            if written == 0:
+                f.write(b"%s %s %d %d\n" % (MAGIC, format.encode(), frame.shape[1], frame.shape[0]))
+            f.write(frame.tobytes())
+            written += 1
+    return written
+
+
+class RawSequence(object):
+    """
+    Frames of a raw sequence file, memory mapped. Every frame is a read
+    only view of the mapping, nothing is copied until the scanner needs
+    the intensity of colour pixels.
+    """
+
+    _filename: str
+    _width: int = 0
+    _height: int = 0
+    _format: str = "gray8"
+    # byte offset of the first frame
+    _offset: int = 0
+    # one row of bytes per frame
+    _frames: np.ndarray
+
+    def __init__(
+        self,
+        filename: str,
+        width: int | None = None,
+        height: int | None = None,
+        format: str | None = None,
+        offset: int = 0,
+    ):
+        """
+        Without width, height and format they are read from the header
+        (see writeSequence). Headerless dumps need all three, frames
+        start at offset.
+        """
+        self._filename = filename
+        if width is None or height is None or format is None:
+            with open(filename, "rb") as f:
+                header = f.readline(256)
+            fields = header.split()
+            if len(fields) != 4 or fields[0] != MAGIC:
+                raise ValueError(filename + " has no raw sequence header, give width, height and format")
+            format, width, height = fields[1].decode(), int(fields[2]), int(fields[3])
+            offset = len(header)
+        if format not in FORMATS:
+            raise ValueError("unknown pixel format: " + str(format))
+        self._width = width
+        self._height = height
+        self._format = format
+        self._offset = offset
+
+        size: int = width * height * FORMATS[format]
+        count: int = (os.path.getsize(filename) - offset) // size
+        if count > 0:
+            self._frames = np.memmap(filename, dtype=np.uint8, mode="r", offset=offset, shape=(count, size))
+        else:
+            self._frames = np.empty((0, size), dtype=np.uint8)
+
+    def __len__(self) -> int:
+        return self._frames.shape[0]
+
+    def __getitem__(self, index: int) -> np.ndarray:
+        """(height, width, bytes per pixel) view of a frame"""
+        return pixels(self._frames[index], self._width, self._height, self._format)
+
+    def __iter__(self) -> Iterator[np.ndarray]:
+        for index in range(len(self)):
+            yield self[index]
+
+    @property
+    def width(self) -> int:
+        return self._width
+
+    @property
+    def height(self) -> int:
+        return self._height
+
+    @property
+    def format(self) -> str:
+        return self._format
+
+    def gray(self, index: int) -> np.ndarray:
+        """Intensity plane of a frame, a view for gray8 and yuyv"""
+        return gray(self._frames[index], self._width, self._height, self._format)
+
+    def scan(self, scanner: "Scanner", jobs: int = 1) -> Iterator[tuple[int, list[TopCode]]]:
+        """
+        Scans every frame and yields (frame index, topcodes) in frame
+        order. With jobs > 1 the frames are spread over worker
+        processes, each maps the file itself and scans with a copy of
+        the scanner's settings; only frame indices and codes travel.
+        """
+        if jobs <= 1:
+            for index in range(len(self)):
+                yield index, scanner.scan_rgb_data(self._frames[index], self._width, self._height, self._format)
+            return
+        # workers report to a fork of the probe, merged frame by frame
+        stage = scanner._stage()
+        stage._probe = scanner.probe.fork()
+        args = (stage, self._filename, self._width, self._height, self._format, self._offset)
+        with multiprocessing.Pool(jobs, initializer=_startWorker, initargs=args) as pool:
+            for index, codes, measured in pool.imap(_scanFrame, range(len(self)), chunksize=4):
+                scanner.probe.merge(measured)
+                yield index, codes
+
+
+# the sequence and scanner of a worker process
+_worker: tuple[RawSequence, "Scanner"] | None = None
+
+
+def _startWorker(scanner: "Scanner", filename: str, width: int, height: int, format: str, offset: int) -> None:
+    """Maps the sequence in a worker process"""
+    global _worker
+    _worker = (RawSequence(filename, width, height, format, offset), scanner)
+
+
+def _scanFrame(index: int) -> tuple[int, list[TopCode], "Probe"]:
+    """Scans a frame in a worker, returns the measurements of it as well"""
+    sequence, scanner = _worker
+    codes = scanner.scan_rgb_data(sequence._frames[index], sequence.width, sequence.height, sequence.format)
+    measured = scanner.probe
+    scanner._probe = measured.fork()
+    return index, codes, measured
@@ -0,0 +1,78 @@
+"""
+Scan results as one structured numpy array.
+
+A list of TopCode objects costs a Python object per code and has to be
+pickled field by field when it is sent to another process. A record
+array keeps code, x, y, unit, orientation and confidence of every code
+in one buffer of RECORD.itemsize bytes per code, columns are read as
+records["x"]. pack turns it into bytes with a small header, unpack
+reads them back as a view without copying.
+
+python version by PapstJL4U
+"""
+from typing import Iterable
+from topcode import TopCode
+import numpy as np
+import struct as struct
+
+# one code, little endian, 40 bytes (floats keep full precision)
+RECORD: np.dtype = np.dtype(
+    [
+        ("code", "<i4"),
+        ("confidence", "<i4"),
+        ("x", "<f8"),
+        ("y", "<f8"),
+        ("unit", "<f8"),
+        ("orientation", "<f8"),
+    ]
+)
+
+# first bytes of packed records
+MAGIC: bytes = b"TCR1"
+# magic and number of records
+_HEADER: struct.Struct = struct.Struct("<4sI")
+
+
+def fromCodes(codes: Iterable[TopCode]) -> np.ndarray:
+    """Returns the records of the codes, in the same order"""
+    return np.array(
+        [(c.code, c.confidence, c.x, c.y, c.unit, c.orientation) for c in codes],
+        dtype=RECORD,
+    )
+
+
+def toCodes(records: np.ndarray) -> list[TopCode]:
+    """Returns a TopCode for every record"""
+    codes: list[TopCode] = []
+    for code, confidence, x, y, unit, orientation in records.tolist():
+        topcode = TopCode()
+        topcode.code = code
+        topcode.confidence = confidence
+        topcode.setLocation(x, y)
+        topcode.unit = unit
+        topcode.orientation = orientation
+        codes.append(topcode)
+    return codes
+
+
+def pack(records: np.ndarray) -> bytes:
+    """Serializes records (see fromCodes) into a header and the raw records"""
+    records = np.ascontiguousarray(records, dtype=RECORD)
+    return _HEADER.pack(MAGIC, records.size) + records.tobytes()
+
+
+def unpack(data) -> np.ndarray:
+    """
+    Reads records packed by pack from any buffer (bytes, memoryview,
+    mmap). The array is a read only view of the buffer.
+    """
+    view = memoryview(data).cast("B")
+    if view.nbytes < _HEADER.size:
+        raise ValueError("packed records too short")
+    magic, size = _HEADER.unpack_from(view)
+    if magic != MAGIC:
+        raise ValueError("not packed topcode records")
+    if view.nbytes < _HEADER.size + size * RECORD.itemsize:
+        have: int = (view.nbytes - _HEADER.size) // RECORD.itemsize
+        raise ValueError("packed records truncated: %d of %d records" % (have, size))
+    return np.frombuffer(view, dtype=RECORD, count=size, offset=_HEADER.size)
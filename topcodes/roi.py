@@ -0,0 +1,147 @@
+"""
+Regions of interest: scan only parts of a frame.
+
+A RegionOfInterest is made of rectangles and/or a mask in frame
+coordinates. For a frame size it works out the windows to scan once:
+every rectangle (or every mask cell with pixels set) grows by a margin,
+big enough to read a code of the maximum diameter centered on its
+border and to warm up the running sum of the threshold, and
+overlapping windows are merged. The windows are cached, so a region
+can be used for every frame of a feed without checking it again.
+
+Only the windows are converted, thresholded and searched, codes are
+returned in frame coordinates if their center lies in the region.
+
+python version by PapstJL4U
+"""
+from typing import TYPE_CHECKING, Callable, Iterable
+from topcode import TopCode
+import numpy as np
+import spatial
+
+if TYPE_CHECKING:
+    from scanner import Scanner
+
+# edge length in pixels of the cells a mask is split into
+MASK_CELL: int = 64
+
+
+class RegionOfInterest(object):
+    # [x0, y0, x1, y1) rectangles in frame coordinates
+    _rects: list[tuple[int, int, int, int]]
+    # boolean mask of the frame, True inside the region
+    _mask: np.ndarray | None = None
+    # pixels added around the region, None: from the maximum code diameter
+    _margin: int | None = None
+    # windows per (width, height, maximum unit)
+    _windows: dict[tuple[int, int, int], list[list[int]]]
+
+    def __init__(
+        self,
+        rects: Iterable[tuple[int, int, int, int]] = (),
+        mask: np.ndarray | None = None,
+        margin: int | None = None,
+    ):
+        """
+        rects are [x0, y0, x1, y1) boxes, mask is a (height, width)
+        array that is True (non zero) inside the region. margin
+        overrides the pixels scanned around the region.
+        """
+        self._rects = []
+        for rect in rects:
+            x0, y0, x1, y1 = (int(v) for v in rect)
+            if x1 <= x0 or y1 <= y0:
+                raise ValueError("empty region: " + str(rect))
+            self._rects.append((x0, y0, x1, y1))
+        if mask is not None:
+            mask = np.asarray(mask)
+            if mask.ndim != 2:
+                raise ValueError("mask must be a (height, width) array")
+            self._mask = mask.astype(bool)
+        if not self._rects and self._mask is None:
+            raise ValueError("a region needs rectangles or a mask")
+        if margin is not None and margin < 0:
+            raise ValueError("margin must not be negative")
+        self._margin = margin
+        self._windows = {}
+
+    def margin(self, maxu: int) -> int:
+        """Pixels scanned around the region for codes of unit maxu"""
+        if self._margin is not None:
+            return self._margin
+        return spatial.margin(maxu)
+
+    def windows(self, width: int, height: int, maxu: int) -> list[list[int]]:
+        """
+        Returns the merged [x0, y0, x1, y1) windows to scan in a frame of
+        the given size, computed once per size
+        """
+        key = (width, height, maxu)
+        if key not in self._windows:
+            self._windows[key] = self._layout(width, height, maxu)
+        return self._windows[key]
+
+    def _layout(self, width: int, height: int, maxu: int) -> list[list[int]]:
+        if self._mask is not None and self._mask.shape != (height, width):
+            raise ValueError("mask is %dx%d, frame is %dx%d" % (self._mask.shape[1], self._mask.shape[0], width, height))
+        boxes: list[tuple[int, int, int, int]] = list(self._rects)
+        if self._mask is not None:
+            rows, cols = -(-height // MASK_CELL), -(-width // MASK_CELL)
+            cells = np.zeros((rows * MASK_CELL, cols * MASK_CELL), dtype=bool)
+            cells[:height, :width] = self._mask
+            used = cells.reshape(rows, MASK_CELL, cols, MASK_CELL).any(axis=(1, 3))
+            for j, i in zip(*np.nonzero(used)):
+                x0, y0 = int(i) * MASK_CELL, int(j) * MASK_CELL
+                boxes.append((x0, y0, x0 + MASK_CELL, y0 + MASK_CELL))
+
+        m: int = self.margin(maxu)
+        grown: list[list[int]] = []
+        for x0, y0, x1, y1 in boxes:
+            # windows start on even rows, their serpentine walk runs like the one of the frame
+            box = [max(0, x0 - m), max(0, y0 - m) & ~1, min(width, x1 + m), min(height, y1 + m)]
+            if box[0] < box[2] and box[1] < box[3]:
+                grown.append(box)
+        return spatial.mergeBoxes(grown)
+
+    def contains(self, x: float, y: float) -> bool:
+        """Returns true if point (x,y) lies in the region"""
+        for x0, y0, x1, y1 in self._rects:
+            if x0 <= x < x1 and y0 <= y < y1:
+                return True
+        if self._mask is not None:
+            i, j = round(x), round(y)
+            height, width = self._mask.shape
+            return 0 <= i < width and 0 <= j < height and bool(self._mask[j, i])
+        return False
+
+
+def scanRegions(
+    scanner: "Scanner",
+    region: RegionOfInterest,
+    width: int,
+    height: int,
+    crop: Callable[[int, int, int, int], np.ndarray],
+) -> list[TopCode]:
+    """
+    Scans the windows of the region in a frame of the given size.
+    crop(x0, y0, x1, y1) returns the gray plane of a window. ccount and
+    tcount of the scanner are the sums over all windows, its planes
+    are those of the last window.
+    """
+    probe = scanner.probe
+    codes: list[TopCode] = []
+    ccount: int = 0
+    tcount: int = 0
+    for x0, y0, x1, y1 in region.windows(width, height, scanner._maxu):
+        start = probe.start("ingest")
+        gray = crop(x0, y0, x1, y1)
+        probe.stop("ingest", start)
+        for code in scanner._scan_plane(gray):
+            code.setLocation(code.x + x0, code.y + y0)
+            if region.contains(code.x, code.y):
+                codes.append(code)
+        ccount += scanner.ccount
+        tcount += scanner.tcount
+    scanner._ccount = ccount
+    scanner._tcount = tcount
+    return codes
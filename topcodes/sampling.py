@@ -0,0 +1,56 @@
+"""
+Cached sample offset tables for reading TopCodes.
+
+A reading takes 8 samples across the diameter of the symbol for each
+of the 13 sectors. The sample offsets only depend on the arc adjustment
+and the unit of the symbol. Arc adjustments come from a small fixed set
+(10 steps per sector) and units are measured in 1/8 pixel steps by
+readUnit, so a video feed keeps asking for the same few tables.
+Both caches are bounded and evict the least recently used table.
+
+The angles are computed exactly like the per sample loops did, with
+math.cos/math.sin, so cached offsets give identical sample positions.
+
+python version by PapstJL4U
+"""
+from functools import lru_cache
+from topcode import TopCode
+import numpy as np
+import math as math
+
+# Sectors in reading order: sector 12 first, it ends up in the highest bit
+SECTORS: np.ndarray = np.arange(TopCode._sectors - 1, -1, -1)
+# Distance of the 8 samples from the center, in units
+RINGS: np.ndarray = np.arange(TopCode._width) - 3.5
+
+
+@lru_cache(maxsize=128)
+def directions(arca: float) -> tuple[np.ndarray, np.ndarray]:
+    """cos and sin of every sector (in reading order) rotated by arca"""
+    angles = [TopCode._ARC * sector + arca for sector in SECTORS.tolist()]
+    dx = np.array([math.cos(angle) for angle in angles])
+    dy = np.array([math.sin(angle) for angle in angles])
+    dx.flags.writeable = False
+    dy.flags.writeable = False
+    return dx, dy
+
+
+@lru_cache(maxsize=1024)
+def offsets(arca: float, unit: float) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Horizontal and vertical offsets of all samples from the center of
+    a symbol, shape (sectors, width). Read only, the tables are shared.
+    """
+    dx, dy = directions(arca)
+    dist = RINGS * unit
+    ox = dx[:, None] * dist
+    oy = dy[:, None] * dist
+    ox.flags.writeable = False
+    oy.flags.writeable = False
+    return ox, oy
+
+
+def stacked(arcas: np.ndarray, units: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Offsets for every (arca, unit) pair, shape (pairs, sectors, width)"""
+    tables = [offsets(a, u) for a, u in zip(arcas.tolist(), units.tolist())]
+    return np.stack([t[0] for t in tables]), np.stack([t[1] for t in tables])
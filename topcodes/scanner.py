@@ -10,97 +10,321 @@ author Michael Horn
 
 python version by PapstJL4U
 """
-from typing import no_type_check
+from typing import Iterable, Iterator, no_type_check
 from PIL import Image
 from itertools import count, islice
-from topcode import TopCode
+from topcode import TopCode, CHECKSUM_TABLE
+from buffers import Buffers
+import numpy as np
+import wellner
+import bullseye
+import sampling
+import pipeline
+import tiles
+import rawframes
+import strips
+import spatial
+import pyramid
+import roi
+import records
+import preview
+import instrument
 import math as math
-import time as T
+
+# highest confidence of a reading: 8 samples of 13 sectors
+MAX_CONFIDENCE: int = TopCode._sectors * TopCode._width * 0xFF
+# bullseyes whose width and height differ by more than this part of
+# their sum are rejected before the unit is read
+_ASYMMETRY: float = 1 / 3
+# sectors whose core rings must read right at the first arc adjustment
+_CORE_SECTORS: int = 10
 
 
 class Scanner(object):
+    __slots__ = (
+        "_image",
+        "_raw",
+        "_width",
+        "_height",
+        "_gray",
+        "_bw",
+        "_cand",
+        "_bw3",
+        "_sample3",
+        "_previews",
+        "_tested",
+        "_found",
+        "_ccount",
+        "_tcount",
+        "_maxu",
+        "_mind",
+        "_engine",
+        "_roi",
+        "_probe",
+        "_buffers",
+        "_results",
+        "_confidence",
+    )
+
     # original image
     _image: Image.Image
+    # raw data (buffer, width, height, format, stride) of scan_rgb_data
+    _raw: tuple | None
     # Total width of the image
-    _width = 0
+    _width: int
     # Total height of the image
-    _height = 0
-    # Holds process binary pixel data
-    _data: list[int] = []
-    # Binary view of the image
-    _preview: Image.Image
-    # reduce processing if done already via check
-    _preview_exists = False
+    _height: int
+    # Pixel intensities (r + g + b) // 3 of the image, uint8
+    _gray: np.ndarray
+    # Binary (threshold black/white) plane, uint8 0 or 1
+    _bw: np.ndarray
+    # Bullseye candidate plane, uint8 0 or 1
+    _cand: np.ndarray
+    # 3x3 majority of the binary plane, computed on first use
+    _bw3: np.ndarray | None
+    # 3x3 average of the binary plane (0-255), computed on first use
+    _sample3: np.ndarray | None
+    # previews of the current planes per overlay options, see getPreview
+    _previews: dict[tuple[bool, bool, bool], Image.Image]
+    # candidate centers (x, y) decoded in the current planes
+    _tested: list[tuple[int, int]]
+    # codes (x, y, diameter) found in the current planes
+    _found: list[tuple[float, float, float]]
     # candidate code count
-    _ccount: int = 0
+    _ccount: int
     # number of candidates tested
-    _tcount: int = 0
+    _tcount: int
     # maximum width of a topcode unit in pixel
     # very important to find codes
-    _maxu: int = 80
-
-    def __init__(self):
-        pass
-
-    def scan_by_filename(self, filename: str = "") -> list[TopCode]:
+    _maxu: int
+    # minimum code diameter in pixel, 0 scans at full resolution
+    _mind: float
+    # thresholding engine, see setEngine
+    _engine: str
+    # only these parts of a frame are scanned, see setRegionOfInterest
+    _roi: roi.RegionOfInterest | None
+    # receives stage timings and counters, see setProbe
+    _probe: instrument.Probe
+    # working arrays reused from frame to frame, None allocates per frame
+    _buffers: Buffers | None
+    # result format of the scan methods, see setResultFormat
+    _results: str
+    # part of MAX_CONFIDENCE that ends the arc search early, 0 never
+    _confidence: float
+
+    def __init__(self, engine: str = "array"):
+        self._raw = None
+        self._width = 0
+        self._height = 0
+        self._bw3 = None
+        self._sample3 = None
+        self._previews = {}
+        self._tested = []
+        self._found = []
+        self._ccount = 0
+        self._tcount = 0
+        self._maxu = 80
+        self._mind = 0
+        self._roi = None
+        self._probe = instrument.NULL_PROBE
+        self._buffers = Buffers()
+        self._results = "codes"
+        self._confidence = 0.0
+        self.setEngine(engine)
+
+    def scan_by_filename(self, filename: str = "") -> list[TopCode] | np.ndarray:
         with Image.open(filename) as im:
             return self.scan_image(im)
 
-    def scan_image(self, image: Image.Image) -> list[TopCode]:
+    def scan_image(self, image: Image.Image) -> list[TopCode] | np.ndarray:
         """Scan the given image and return a list of all topcodes"""
         self._image = image
-        # self._preview = None
-        self._width = image.width
-        self._height = image.height
-        LOP = list(image.convert("RGBA").getdata())
-        self._data = [0] * len(LOP)
-
-        start: float = T.time()
-        for i in islice(count(start=0, step=1), len(LOP)):
-            r, g, b, alpha = LOP[i]
-            # rgb = 256*256*256 * alpha + 65536 * r + 256 * g + b
-            # https://stackoverflow.com/questions/4801366/convert-rgb-values-to-integer
-            # the original java algorithm expects alpha + rgb, not rgb + alpha as the byte order
-            pixel: int = 0x1000000 * alpha + 0x10000 * r + 0x100 * g + b
-            self._data[i] = pixel
-
-        end: float = T.time()
-        print("RGBA->ARGB time: " + str(1000 * (end - start)))
-
-        start = T.time()
-        self._threshold()
-        end = T.time()
-        print("threshold time: " + str(1000 * (end - start)))
+        self._raw = None
+        probe = self._probe
+        frame = probe.start("frame")
+        if self._roi is not None:
+            if isinstance(image, np.ndarray):
+                height, width = image.shape[:2]
+                crop = lambda x0, y0, x1, y1: self._ingest(image[y0:y1, x0:x1])
+            else:
+                width, height = image.size
+                crop = lambda x0, y0, x1, y1: self._ingest(image.crop((x0, y0, x1, y1)))
+            fc = roi.scanRegions(self, self._roi, width, height, crop)
+        else:
+            start = probe.start("ingest")
+            gray = self._ingest(image)
+            probe.stop("ingest", start)
+            fc = self._scan_gray(gray)
+        probe.stop("frame", frame)
+        probe.frame()
+        return self._result(fc)
+
+    def _scan_gray(self, gray: np.ndarray) -> list[TopCode]:
+        """Thresholds a gray plane and returns all topcodes in it"""
+        return self._scan_plane(gray)
+
+    def _scan_plane(self, gray: np.ndarray) -> list[TopCode]:
+        """_scan_gray of a plain scanner, subclasses keep it as it is"""
+        if self._mind > 0 and pyramid.factor(self._mind) > 1:
+            return pyramid.scanPyramid(self, gray, self._mind)
+        self._prepare(gray)
+        return self._findCodes()
 
+    def _scan_frame(self, gray: np.ndarray) -> list[TopCode]:
+        """Scans the gray plane of a whole frame, in the windows of the region of interest if there is one"""
+        if self._roi is None:
+            return self._scan_gray(gray)
+        height, width = gray.shape
+        return roi.scanRegions(self, self._roi, width, height, lambda x0, y0, x1, y1: gray[y0:y1, x0:x1])
+
+    def _wholeFrame(self) -> bool:
         """
-        # debugging
-        with open("tops_adapt_py.int", "w") as f:
-            for pixel in self._data:
-                f.write(format(pixel, "b") + "\n")
+        Returns True if _scan_frame just thresholds the whole plane and
+        searches it, so another scanner may threshold it (see pipeline.py)
         """
-        start = T.time()
-        fc = self._findCodes()
-        end = T.time()
-        print("_findCodes() time: " + str(1000 * (end - start)))
+        if self._roi is not None or (self._mind > 0 and pyramid.factor(self._mind) > 1):
+            return False
+        return type(self)._scan_gray is Scanner._scan_gray
+
+    def _prepare(self, gray: np.ndarray) -> None:
+        """Sets the gray plane and thresholds it"""
+        self._gray = gray
+        self._height, self._width = gray.shape
+        self._threshold()
 
-        return fc
+    def _setPlanes(self, gray: np.ndarray, bw: np.ndarray, cand: np.ndarray, ccount: int) -> None:
+        """Takes over planes thresholded by another scanner"""
+        self._gray = gray
+        self._height, self._width = gray.shape
+        self._bw = bw
+        self._cand = cand
+        self._ccount = ccount
+        self._bw3 = None
+        self._sample3 = None
+        self._previews = {}
+        self._tested = []
+        self._found = []
+
+    def _stage(self) -> "Scanner":
+        """Returns a plain scanner with the same settings"""
+        stage = Scanner(self._engine)
+        stage._maxu = self._maxu
+        stage._mind = self._mind
+        stage._probe = self._probe
+        stage._results = self._results
+        stage._confidence = self._confidence
+        if self._buffers is None:
+            stage._buffers = None
+        return stage
+
+    def stream(self, frames: Iterable, depth: int = 2, latest: bool = False) -> Iterator[tuple[int, list[TopCode]]]:
+        """
+        Scans a stream of frames (Pillow images or numpy arrays) and
+        yields (frame index, topcodes) in frame order. Ingest,
+        thresholding and decoding of consecutive frames overlap in
+        worker threads connected by queues of the given depth.
+        With latest=True the oldest waiting frame is dropped whenever
+        the source is faster than the scanner, which is meant for live
+        sources: nearly all frames of a list are dropped. See pipeline.py.
+        """
+        return pipeline.FramePipeline(self, depth, latest).run(frames)
 
-    def scan_rgb_data(self, rgb: list[int], width: int, height: int) -> list[TopCode]:
-        """untested java -> python image->pillow"""
-        raise NotImplementedError
-        self._width = width
-        self._height = height
-        self._data = rgb
-        # unsure
-        # should be wrong, see above
-        self._image = Image.fromarray(rgb, mode="RGBA")
+    def scan_tiled(
+        self, image: Image.Image, bands: int | None = None, executor=None
+    ) -> list[TopCode] | np.ndarray:
+        """
+        Scans a large image in horizontal bands (default: one per core)
+        on a process pool, or on the given executor. Bands overlap by
+        enough rows to warm up the threshold and to read codes of the
+        maximum diameter, see tiles.py. Codes across band borders are
+        only reported once.
+        """
+        self._image = image
+        self._raw = None
+        probe = self._probe
+        frame = probe.start("frame")
+        start = probe.start("ingest")
+        gray = self._ingest(image)
+        probe.stop("ingest", start)
+        fc = tiles.scanTiled(self, gray, bands, executor)
+        probe.stop("frame", frame)
+        probe.frame()
+        return self._result(fc)
+
+    def scan_strips(self, source: Image.Image | Iterable, rows: int = 256) -> Iterator[TopCode]:
+        """
+        Scans an image of any height strip by strip and yields the codes
+        from top to bottom as soon as they are decoded. Only a window of
+        rows sized by setMaxCodeDiameter is kept, see strips.py. source
+        is a Pillow image (uncompressed files are read from disk rows
+        at a time) or an iterable of row blocks (images or numpy arrays).
+        The codes are those of a full frame scan with the array engine.
+        """
+        if isinstance(source, Image.Image):
+            source = strips.imageBands(source, rows)
+        return strips.scanStrips(self, source)
 
-        self._threshold()
-        return self._findCodes()
+    def _ingest(self, image: Image.Image | np.ndarray) -> np.ndarray:
+        """
+        Turns the image into the gray plane the threshold works on.
+        The intensity is the plain average (r + g + b) // 3 of the
+        java algorithm, not Pillow's weighted "L" conversion, so
+        only gray images can be used as they are.
+        numpy arrays are taken as gray (h, w) or (h, w, 1), YUYV
+        (h, w, 2) of which the luma is used, or RGB(A) (h, w, 3|4), like
+        the frames of a rawframes.RawSequence.
+        """
+        if isinstance(image, np.ndarray):
+            if image.ndim == 2:
+                return image.astype(np.uint8, copy=False)
+            if image.shape[2] < 3:
+                return image[:, :, 0].astype(np.uint8, copy=False)
+            return rawframes.average(image.astype(np.uint8, copy=False), buffers=self._buffers)
+        if image.mode == "L":
+            return np.asarray(image)
+        if image.mode not in ("RGB", "RGBA"):
+            # P, LA, CMYK, ... are expanded by Pillow's C converters
+            image = image.convert("RGB")
+        # Pillow hands its pixels over as a new array, that copy stays
+        return rawframes.average(np.asarray(image), buffers=self._buffers)
+
+    def scan_rgb_data(
+        self, rgb, width: int, height: int, format: str = "argb", stride: int | None = None
+    ) -> list[TopCode] | np.ndarray:
+        """
+        Scans raw pixel data and returns a list of all topcodes. By
+        default rgb holds packed ARGB integers like the java
+        scan(int[] rgb, w, h), other formats are gray8, rgb24, bgr24 and
+        yuyv in any buffer (bytes, memoryview, array, numpy array), with
+        stride bytes per row. Gray and YUYV buffers are scanned without
+        copying, see rawframes.py. The buffer must not change during the
+        scan.
+        """
+        probe = self._probe
+        frame = probe.start("frame")
+        self._raw = (rgb, width, height, format, stride)
+        if self._roi is not None:
+            view = rawframes.pixels(rgb, width, height, format, stride)
+            crop = lambda x0, y0, x1, y1: rawframes.gray(view[y0:y1, x0:x1], x1 - x0, y1 - y0, format, None, self._buffers)
+            fc = roi.scanRegions(self, self._roi, width, height, crop)
+        else:
+            start = probe.start("ingest")
+            gray = rawframes.gray(rgb, width, height, format, stride, self._buffers)
+            probe.stop("ingest", start)
+            fc = self._scan_gray(gray)
+        probe.stop("frame", frame)
+        probe.frame()
+        return self._result(fc)
 
     @property
     def image(self) -> Image.Image:
-        """Returns the original, unaltered image"""
+        """
+        Returns the original, unaltered image. Raw data is turned into
+        an image when it is asked for the first time.
+        """
+        if self._raw is not None:
+            self._image = rawframes.toImage(*self._raw)
+            self._raw = None
         return self._image
 
     @property
@@ -127,6 +351,135 @@ class Scanner(object):
         f: float = diameter / 8.0
         self._maxu = (int)(math.ceil(f))
 
+    def setMinCodeDiameter(self, diameter: float = 0) -> None:
+        """
+        Sets the minimum diameter (in pixels) of the TopCodes to find.
+        Large codes are searched on a shrunk copy of the image and only
+        decoded at full resolution, see pyramid.py. Smaller codes may be
+        missed. 0 (default) scans every pixel at full resolution.
+        After a shrunk scan the pixel accessors and getPreview only
+        describe the last decoded window.
+        """
+        self._mind = max(0.0, diameter)
+
+    def setRegionOfInterest(self, region=None) -> None:
+        """
+        Limits scan_image and scan_rgb_data to a region of the frame: a
+        roi.RegionOfInterest, a list of [x0, y0, x1, y1) rectangles or a
+        (height, width) mask. Only windows around the region are
+        converted, thresholded and searched, codes centered in the region
+        are returned in frame coordinates. The region is checked once
+        and its windows are reused for every frame of the same size.
+        None scans whole frames again.
+        """
+        if region is None or isinstance(region, roi.RegionOfInterest):
+            self._roi = region
+        elif isinstance(region, np.ndarray):
+            self._roi = roi.RegionOfInterest(mask=region)
+        else:
+            self._roi = roi.RegionOfInterest(region)
+
+    @property
+    def regionOfInterest(self) -> roi.RegionOfInterest | None:
+        """Returns the region scanned, None for whole frames"""
+        return self._roi
+
+    def setEngine(self, engine: str = "array") -> None:
+        """
+        Selects the thresholding engine. "array" (default) runs the
+        Wellner threshold on numpy arrays (see wellner.py), "reference"
+        is the original per pixel loop. Both produce identical data.
+        """
+        if engine not in ("array", "reference"):
+            raise ValueError("unknown engine: " + str(engine))
+        self._engine = engine
+
+    @property
+    def engine(self) -> str:
+        """Returns the name of the thresholding engine"""
+        return self._engine
+
+    def setProbe(self, probe: instrument.Probe | None = None) -> None:
+        """
+        Reports stage timings and counters of every scan to the probe,
+        e.g. an instrument.Recorder. None switches instrumentation off.
+        """
+        self._probe = probe or instrument.NULL_PROBE
+
+    @property
+    def probe(self) -> instrument.Probe:
+        """Returns the probe receiving the measurements"""
+        return self._probe
+
+    def setConfidenceThreshold(self, threshold: float = 0.0) -> None:
+        """
+        Accepts a reading at the first arc adjustment if its confidence
+        reaches threshold * MAX_CONFIDENCE, instead of searching all
+        arc adjustments for the best one. Clean codes read 0.85 to 0.95,
+        lower thresholds can accept misread codes. The orientation of
+        an early reading is less precise (up to a tenth of a sector).
+        0 (default) always searches all of them.
+        """
+        if not 0.0 <= threshold <= 1.0:
+            raise ValueError("threshold must be between 0 and 1")
+        self._confidence = threshold
+
+    def setResultFormat(self, results: str = "codes") -> None:
+        """
+        Selects what the scan methods return: "codes" (default) a list
+        of TopCode objects, "records" one structured array with code,
+        confidence, x, y, unit and orientation per code (see records.py),
+        which is cheaper for many codes and sent to other processes as
+        a single buffer. scan_strips always yields TopCode objects.
+        """
+        if results not in ("codes", "records"):
+            raise ValueError("unknown result format: " + str(results))
+        self._results = results
+
+    @property
+    def resultFormat(self) -> str:
+        """Returns the result format of the scan methods"""
+        return self._results
+
+    def _result(self, codes: list[TopCode]) -> list[TopCode] | np.ndarray:
+        """Returns the codes of a scan in the selected result format"""
+        if self._results == "records":
+            return records.fromCodes(codes)
+        return codes
+
+    def setBufferReuse(self, reuse: bool = True) -> None:
+        """
+        Keeps the working arrays (gray, binary and candidate planes,
+        running sums, ...) from frame to frame (default). Frames of the
+        same size are then scanned without large allocations, but the
+        planes of a scan are overwritten by the next one. False
+        allocates new arrays for every frame and releases the buffers.
+        """
+        if not reuse:
+            self._buffers = None
+        elif self._buffers is None:
+            self._buffers = Buffers()
+
+    @property
+    def bufferReuse(self) -> bool:
+        """Returns True if working arrays are reused from frame to frame"""
+        return self._buffers is not None
+
+    @property
+    def residentBytes(self) -> int:
+        """
+        Returns the bytes of working arrays the scanner keeps between
+        scans: its buffers and the planes of the last scan that live
+        outside of them (e.g. planes handed over by a pipeline stage,
+        or a gray plane that is a view of the caller's frame).
+        """
+        total: int = self._buffers.nbytes if self._buffers is not None else 0
+        for name in ("_gray", "_bw", "_cand", "_bw3", "_sample3"):
+            plane = getattr(self, name, None)
+            if plane is not None and (self._buffers is None or not self._buffers.owns(plane)):
+                total += plane.nbytes
+        return total
+
     @property
     def ccount(self) -> int:
         """Returns the number of candidate topcodes found during a scan"""
@@ -139,8 +492,7 @@ class Scanner(object):
 
     def getBW(self, x: int, y: int) -> int:
         """Binary (threshold black/white) value for pixel (x,y)"""
-        pixel = self._data[y * self._width + x]
-        return (pixel >> 24) & 0x01
+        return self._bw.item(y, x)
 
     def getSample3x3(self, x: int, y: int) -> int:
         """
@@ -150,15 +502,9 @@ class Scanner(object):
 
         if x < 1 or x > (self._width - 2) or y < 1 or y > (self._height - 2):
             return 0
-        pixel: int = 0
-        summ: int = 0
-        for j in range(y - 1, y + 2, 1):
-            for i in range(x - 1, x + 2, 1):
-                pixel = self._data[j * self._width + i]
-                if (pixel & 0x01000000) > 0:
-                    summ += 0xFF
-
-        return summ // 9
+        if self._sample3 is None:
+            self._neighbourhood()
+        return self._sample3.item(y, x)
 
     def getBW3x3(self, x: int, y: int) -> int:
         """
@@ -167,18 +513,68 @@ class Scanner(object):
         """
         if x < 1 or x > (self._width - 2) or y < 1 or y > (self._height - 2):
             return 0
+        if self._bw3 is None:
+            self._neighbourhood()
+        return self._bw3.item(y, x)
 
-        summ: int = 0
-        for j in range(y - 1, y + 2, 1):
-            for i in range(x - 1, x + 2, 1):
-                pixel: int = self._data[j * self._width + i]
-                summ += (pixel >> 24) & 0x01
-        if summ >= 5:
-            return 1
-        else:
-            return 0
+    def _neighbourhood(self) -> None:
+        """
+        Box filters the binary plane once per frame, so getBW3x3 and
+        getSample3x3 become single lookups. Border pixels stay 0.
+        """
+        buffers = self._buffers or Buffers()
+        h, w = self._bw.shape
+        summ = buffers.get("scanner.summ", (h, w), np.uint8)
+        summ.fill(0)
+        if h > 2 and w > 2:
+            inner = summ[1:-1, 1:-1]
+            for j in range(3):
+                for i in range(3):
+                    inner += self._bw[j : j + h - 2, i : i + w - 2]
+        bw3 = buffers.get("scanner.bw3", (h, w), np.bool_)
+        np.greater_equal(summ, 5, out=bw3)
+        self._bw3 = bw3.view(np.uint8)
+        scaled = buffers.get("scanner.scaled", (h, w), np.uint16)
+        np.multiply(summ, np.uint16(0xFF), out=scaled, dtype=np.uint16)
+        scaled //= 9
+        self._sample3 = buffers.get("scanner.sample3", (h, w), np.uint8)
+        np.copyto(self._sample3, scaled, casting="unsafe")
 
     def _threshold(self) -> None:
+        """
+        Perform Wellner adaptive thresholding with the selected engine
+        and mark candidate spotcode locations.
+        """
+        self._bw3 = None
+        self._sample3 = None
+        self._previews = {}
+        self._tested = []
+        self._found = []
+        probe = self._probe
+        if self._engine == "reference":
+            # thresholding and candidate search are a single loop
+            start = probe.start("threshold")
+            self._threshold_reference()
+            probe.stop("threshold", start)
+        else:
+            self._threshold_array()
+        probe.count("ccount", self._ccount)
+
+    def _threshold_array(self) -> None:
+        """
+        Array version of _threshold_reference. The running sums and the
+        binary plane come from wellner.threshold, the candidate
+        locations from bullseye.candidates.
+        """
+        probe = self._probe
+        start = probe.start("threshold")
+        self._bw, _ = wellner.threshold(self._gray, buffers=self._buffers)
+        probe.stop("threshold", start)
+        start = probe.start("candidates")
+        self._cand, self._ccount = bullseye.candidates(self._bw, self._maxu, buffers=self._buffers)
+        probe.stop("candidates", start)
+
+    def _threshold_reference(self) -> None:
         """
         Perform Wellner adaptive thresholding to produce binary pixel
         data.  Also mark candidate spotcode locations.
@@ -202,6 +598,9 @@ class Scanner(object):
         dk: int = 0
 
         self._ccount = 0
+        # gray pixels packed as r = g = b, binary value and running
+        # sum are packed into the same integer while walking the image
+        data: list[int] = (self._gray.astype(np.uint32) * 0x10101).ravel().tolist()
 
         for j in islice(count(start=0, step=1), self._height):
             level, b1, b2, w1 = 0, 0, 0, 0
@@ -216,7 +615,7 @@ class Scanner(object):
                 """
                 Calculate pixen intensity (0-255)
                 """
-                pixel = self._data[k]
+                pixel = data[k]
                 r = (pixel >> 16) & 0xFF
                 g = (pixel >> 8) & 0xFF
                 b = pixel & 0xFF
@@ -232,7 +631,7 @@ class Scanner(object):
                 Factor in sum from the previous row
                 """
                 if k >= self._width:
-                    threshold = (summ + (self._data[k - self._width] & 0xFFFFFF)) // (2 * s)
+                    threshold = (summ + (data[k - self._width] & 0xFFFFFF)) // (2 * s)
                 else:
                     threshold = summ // s
                 """
@@ -247,7 +646,7 @@ class Scanner(object):
                 the alpha channel, and the running sum
                 for this pixel in the rgb channels
                 """
-                self._data[k] = (a << 24) + (summ & 0xFFFFFF)
+                data[k] = (a << 24) + (summ & 0xFFFFFF)
 
                 # on a white region, no black pixels
                 if level == 0:
@@ -296,9 +695,9 @@ class Scanner(object):
                             else:
                                 dk = k + dk
 
-                            self._data[dk - 1] |= mask
-                            self._data[dk] |= mask
-                            self._data[dk + 1] |= mask
+                            data[dk - 1] |= mask
+                            data[dk] |= mask
+                            data[dk + 1] |= mask
                             self._ccount += 3  # count candidate codes
 
                         b1 = b2
@@ -308,44 +707,76 @@ class Scanner(object):
 
                 k += 1 if (j % 2 == 0) else -1
 
-    def _findCodes(self) -> list[TopCode]:
+        packed = np.array(data, dtype=np.uint32).reshape(self._height, self._width)
+        self._bw = ((packed >> 24) & 0x01).astype(np.uint8)
+        self._cand = ((packed >> 25) & 0x01).astype(np.uint8)
+
+    def _findCodes(self, rows: tuple[int, int] | None = None) -> list[TopCode]:
+        """
+        Decodes the candidate clusters, only those centered in
+        rows [r0, r1) if rows are given
+        """
         self._tcount = 0
-        spots: list[TopCode] = []
+        self._previews = {}
+        self._tested = []
+        self._found = []
+        spots: list[tuple[int, TopCode]] = []
         spot: TopCode = TopCode()
-        k: int = self._width * 2
-        starto = T.time()
-        for j in islice(count(start=2, step=1), self._height - 2):
-            for i in islice(count(start=0, step=1), self._width):
-                if (self._data[k] & 0x2000000) > 0:
-                    if (
-                        (self._data[k - 1] & 0x2000000) > 0
-                        and (self._data[k + 1] & 0x2000000) > 0
-                        and (self._data[k - self._width] & 0x2000000) > 0
-                        and (self._data[k + self._width] & 0x2000000) > 0
-                    ):
-                        if not self.overlaps(spots, i, j):
-                            self._tcount += 1
-                            start = T.time()
-                            self.decode(spot, i, j)
-                            end = T.time()
-                            print("decode time(" + str(self._tcount) + "): " + str(1000 * (end - start)))
-                            print("======================================")
-                            if spot.isValid:
-                                spots.append(spot)
-                                spot = TopCode()
-                k += 1
-        endo = T.time()
-        print("findCode Loop time: " + str(1000 * (endo - starto)))
-        return spots
-
-    def overlaps(self, spots: list[TopCode], x: int, y: int) -> bool:
-        """
-        Returns true if point(x,y) is in an exissting TopCode bullseye
-        """
-        for topcode in spots:
-            if topcode.inBullsEye(x, y):
-                return True
-        return False
+        # found codes (whole symbol) and regions where decoding failed
+        found = spatial.BullsEyeIndex()
+        rejected = spatial.BullsEyeIndex()
+        probe = self._probe
+        starto = probe.start("find")
+        # candidates whose 4 neighbours are candidates as well
+        xs, ys = bullseye.centers(self._cand)
+        """
+        Neighbouring candidates belong to the same bullseye, decode per
+        cluster at its centroid. If a bullseye was measured there but not
+        read, the centroid of a noisy cluster may just be off by a pixel:
+        the cluster's points around it (at most 8) are tried as well,
+        nearest to the centroid first. Big clusters are most likely real
+        bullseyes, decoding them first lets their symbols hide the smaller
+        clusters on their rings. Codes can't overlap, so nothing inside a
+        found symbol or a rejected region is decoded again.
+        """
+        for first, cx, cy, _, members in sorted(bullseye.clusters(xs, ys), key=lambda c: -c[3]):
+            i: int = round(cx)
+            j: int = round(cy)
+            if rows is not None and not (rows[0] <= j < rows[1]):
+                continue
+            if found.contains(i, j) or rejected.contains(i, j):
+                continue
+            self._decodeAt(spot, i, j)
+            # the unit measured at the centroid sizes a rejected region
+            unit: float = spot.unit
+            if not spot.isValid and unit > 0:
+                for x, y in bullseye.nearest(members, cx, cy):
+                    if self._decodeAt(spot, x, y):
+                        break
+            if spot.isValid:
+                probe.count("decode.valid")
+                spots.append((first, spot))
+                self._found.append((spot.x, spot.y, spot.diameter))
+                found.add(spot, spot.diameter / 2)
+                spot = TopCode()
+            else:
+                probe.count("decode.invalid")
+                region = TopCode()
+                region.setLocation(i, j)
+                rejected.add(region, max(2.0, unit))
+        probe.stop("find", starto)
+        probe.count("tcount", self._tcount)
+        # report codes in scan order
+        return [spot for _, spot in sorted(spots, key=lambda s: s[0])]
+
+    def _decodeAt(self, spot: TopCode, x: int, y: int) -> bool:
+        """Decodes a candidate of _findCodes, returns True if valid"""
+        self._tcount += 1
+        self._tested.append((x, y))
+        start = self._probe.start("decode")
+        self.decode(spot, x, y)
+        self._probe.stop("decode", start)
+        return spot.isValid
 
     def ydist(self, x: int, y: int, d: int) -> int:
         """
@@ -381,62 +812,42 @@ class Scanner(object):
                 break
         return -1
 
-    def getPreview(self) -> Image.Image:
+    def getPreview(self, candidates: bool = True, tested: bool = True, outlines: bool = False) -> Image.Image:
         """
         For debugging purposes, create a black and white image
-        that shows the result of adaptive thresholding
+        that shows the result of adaptive thresholding. Candidate
+        pixels are green, decoded candidate centers red and with
+        outlines the codes found are circled in blue (see preview.py).
+        The image is rendered on first request and kept for the frame.
         """
-        if self._preview_exists == True:
-            return self._preview
-        self._preview = Image.new(mode="RGBA", size=(self._width, self._height))
-        self._preview_exists = True
-
-        pixel: int = 0
-        k: int = 0
-        for j in range(self._height):
-            for i in range(self._width):
-                pixel = self._data[k] >> 24
-                if pixel == 0:
-                    pixel == 0xFF000000
-                elif pixel == 1:
-                    pixel == 0xFFFFFFFF
-                elif pixel == 3:
-                    pixel == 0xFF00FF00
-                elif pixel == 7:
-                    pixel == 0xFFFF0000
-
-                b: int = pixel & 0xFF
-                g: int = (pixel >> 8) & 0xFF
-                r: int = (pixel >> 16) & 0xFF
-                a: int = (pixel >> 24) & 0xFF
-
-                self._preview.putpixel(xy=(i, j), value=(r, g, b, a))
-                k += 1
-
-        return self._preview
+        key = (candidates, tested, outlines)
+        image = self._previews.get(key)
+        if image is None:
+            image = preview.render(
+                self._bw,
+                self._cand if candidates else None,
+                self._tested if tested else (),
+                self._found if outlines else (),
+            )
+            self._previews[key] = image
+        return image
 
     @no_type_check
     def annotate(self, g: object, topcode: TopCode) -> None:
         """drawing method not yet python conform"""
 
-        dx: float = 0.0
-        dy: float = 0.0
-        dist: float = 0.0
         sx: float = 0.0
         sy: float = 0.0
         bits: int = 0
-        for sector in range(topcode.SECTORS - 1, -1, -1):
-            dx = math.cos(topcode.ARC * sector + topcode.orientation)
-            dy = math.sin(topcode.ARC * sector + topcode.orientation)
+        ox, oy = sampling.offsets(topcode.orientation, topcode.unit)
+        for sector in range(topcode.SECTORS):
 
             # take 8 samples across the diameter of the symbol
 
             sample: int = 0
             for i in range(3, topcode._width):
-                dist = ((float)(i - 3.5)) * self._unit
-
-                sx = round(topcode.x + dx * dist)
-                sy = round(topcode.y + dy * dist)
+                sx = round(topcode.x + ox[sector, i])
+                sy = round(topcode.y + oy[sector, i])
                 sample = self.getBW3x3(sx, sy)
 
                 #
@@ -523,28 +934,24 @@ class Scanner(object):
         unit - width of single ring (codes are 8 units wide)
         arca - arc adjustment. rotation correction delta value
         """
-        dx: float = 0.0
-        dy: float = 0.0
-        dist: float = 0.0
         c: int = 0
         sx: int = 0
         sy: int = 0
         bit: int = 0
         bits: int = 0
         topcode.code = -1
+        self._probe.count("readCode")
 
         topcore = topcode.get_core()
+        ox, oy = (table.tolist() for table in sampling.offsets(arca, topcode.unit))
 
-        # count down from Sectors down to 0
-        for sector in range(topcode.SECTORS - 1, -1, -1):
-            dx = math.cos(topcode.ARC * sector + arca)
-            dy = math.sin(topcode.ARC * sector + arca)
+        # count down from Sectors down to 0 (order of the offset tables)
+        for sector in range(topcode.SECTORS):
 
             # Take 8 samples across the diameter of the symbol
             for i in range(topcode.WIDTH):
-                dist = (i - 3.5) * topcode.unit
-                sx = round(topcode.x + dx * dist)
-                sy = round(topcode.y + dy * dist)
+                sx = round(topcode.x + ox[sector][i])
+                sy = round(topcode.y + oy[sector][i])
                 topcore[i] = self.getSample3x3(sx, sy)
 
             # white rings
@@ -574,56 +981,201 @@ class Scanner(object):
         else:
             return 0
 
-    def decode(self, topcode: TopCode, cx: int, cy: int) -> int:
-        
-        start = T.time()
-        up: int = self.ydist(cx, cy, -1) + self.ydist(cx - 1, cy, -1) + self.ydist(cx + 1, cy, -1)
-        down: int = self.ydist(cx, cy, 1) + self.ydist(cx - 1, cy, 1) + self.ydist(cx + 1, cy, 1)
-        left: int = self.xdist(cx, cy, -1) + self.xdist(cx, cy - 1, -1) + self.xdist(cx, cy + 1, 1)
-        right: int = self.xdist(cx, cy, 1) + self.xdist(cx, cy - 1, 1) + self.xdist(cx, cy + 1, 1)
-
-        end = T.time()
-        print("decode(y/xdist) time: " + str(1000 * (end - start)))
+    def readCodes(self, x, y, unit, arca) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Batched version of readCode. x, y, unit and arca are broadcast
+        against each other and every element is one reading of a symbol
+        centered at (x, y). All samples are gathered at once.
+        Returns the confidence (0 if the reading failed) and the bits of
+        every reading.
+        """
+        x, y, unit, arca = np.broadcast_arrays(*(np.asarray(v, dtype=np.float64) for v in (x, y, unit, arca)))
+        shape = x.shape
+        self._probe.count("readCode", x.size)
+        ox, oy = sampling.stacked(arca.ravel(), unit.ravel())
+        sx = np.rint(x.reshape(-1, 1, 1) + ox).astype(np.intp)
+        sy = np.rint(y.reshape(-1, 1, 1) + oy).astype(np.intp)
+
+        # getSample3x3 for all points: 0 outside of the image
+        inside = (sx >= 1) & (sx <= self._width - 2) & (sy >= 1) & (sy <= self._height - 2)
+        if self._sample3 is None:
+            self._neighbourhood()
+        core = self._sample3[np.where(inside, sy, 0), np.where(inside, sx, 0)].astype(np.int32)
+        core[~inside] = 0
+
+        # white rings, black rings
+        failed = (core[..., 1] <= 128) | (core[..., 3] <= 128) | (core[..., 4] <= 128) | (core[..., 6] <= 128)
+        failed |= (core[..., 2] > 128) | (core[..., 5] > 128)
+
+        # confidence in core sample, data ring and opposite data ring
+        c = core[..., 1] + core[..., 3] + core[..., 4] + core[..., 6] + (0xFF - core[..., 2]) + (0xFF - core[..., 5])
+        c += np.abs(core[..., 7] * 2 - 0xFF)
+        c += 0xFF - np.abs(core[..., 0] * 2 - 0xFF)
+
+        bits = ((core[..., 7] > 128).astype(np.int64) << sampling.SECTORS).sum(axis=1)
+        conf = np.where(failed.any(axis=1) | ~CHECKSUM_TABLE[bits], 0, c.sum(axis=1))
+        return conf.reshape(shape), bits.reshape(shape)
+
+    def _locate(self, topcode: TopCode, cx: int, cy: int) -> None:
+        """
+        Centers the topcode on the bullseye around (cx, cy)
+        and measures its unit
+        """
+        probe = self._probe
+        start = probe.start("decode.locate")
+        ups = (self.ydist(cx, cy, -1), self.ydist(cx - 1, cy, -1), self.ydist(cx + 1, cy, -1))
+        downs = (self.ydist(cx, cy, 1), self.ydist(cx - 1, cy, 1), self.ydist(cx + 1, cy, 1))
+        lefts = (self.xdist(cx, cy, -1), self.xdist(cx, cy - 1, -1), self.xdist(cx, cy + 1, 1))
+        rights = (self.xdist(cx, cy, 1), self.xdist(cx, cy - 1, 1), self.xdist(cx, cy + 1, 1))
+        probe.stop("decode.locate", start)
+        up: int = sum(ups)
+        down: int = sum(downs)
+        left: int = sum(lefts)
+        right: int = sum(rights)
 
         topcode.x = cx
         topcode.x += (right - left) / 6.0
         topcode.y = cy
         topcode.y += (down - up) / 6.0
-        start = T.time()
-        topcode.unit = self.readUnit(topcode)
-        end = T.time()
-        print("decode(readunit()) time: " + str(1000 * (end - start)))
         topcode.code = -1
+        topcode.confidence = 0
+
+        # a bullseye is closed and about as wide as it is high
+        if min(ups + downs + lefts + rights) < 0:
+            probe.count("decode.reject.lost")
+            topcode.unit = -1
+            return
+        if abs(left + right - up - down) > (left + right + up + down) * _ASYMMETRY:
+            probe.count("decode.reject.symmetry")
+            topcode.unit = -1
+            return
+        start = probe.start("decode.unit")
+        topcode.unit = self.readUnit(topcode)
+        probe.stop("decode.unit", start)
+        if topcode.unit < 0:
+            probe.count("decode.reject.unit")
+
+    def coreSectors(self, topcode: TopCode, arca: float = 0.0) -> int:
+        """
+        Counts the sectors whose core rings (white, black, white around
+        the bullseye) read right at the arc adjustment arca. The rings
+        are circles, so one arc tells as much as all of them.
+        """
+        ox, oy = sampling.offsets(arca, topcode.unit)
+        sx = np.rint(topcode.x + ox[:, 1:7]).astype(np.intp)
+        sy = np.rint(topcode.y + oy[:, 1:7]).astype(np.intp)
+
+        # getSample3x3 for all points: 0 outside of the image
+        inside = (sx >= 1) & (sx <= self._width - 2) & (sy >= 1) & (sy <= self._height - 2)
+        if self._sample3 is None:
+            self._neighbourhood()
+        core = np.where(inside, self._sample3[np.where(inside, sy, 0), np.where(inside, sx, 0)], 0)
+
+        # rings 1, 3, 4 and 6 white, rings 2 and 5 black
+        white = (core[:, [0, 2, 3, 5]] > 128).all(axis=1)
+        black = (core[:, [1, 4]] <= 128).all(axis=1)
+        return int((white & black).sum())
+
+    def decode(self, topcode: TopCode, cx: int, cy: int) -> int:
+        """
+        Decodes the candidate at (cx, cy), cheap tests first: bullseye
+        symmetry and unit (see _locate), the core rings at one arc
+        adjustment and only then the search over all arc adjustments.
+        Probe counters tell which test rejected a candidate.
+        """
+        self._locate(topcode, cx, cy)
         if topcode.unit < 0:
             return -1
 
-        c: int = 0
-        maxc: int = 0
-        arca: float = 0
-        maxa: float = 0
-        maxu: float = 0
+        probe = self._probe
+        start = probe.start("decode.read")
+        if self.coreSectors(topcode) < _CORE_SECTORS:
+            probe.stop("decode.read", start)
+            probe.count("decode.reject.core")
+            return topcode.code
+
         """
-        Try different unit and arc adjustments, 
+        Try different unit and arc adjustments,
         save the one that produces a maximum confidence reading...
+        readCode samples with topcode.unit, so every unit adjustment
+        reads the same pixels and the first one (-2) always keeps the
+        maximum. Only the arc adjustments need to be read, unless the
+        first one is confident enough.
         """
-        start = T.time()
-        topcode.unit = self.readUnit(topcode)
-        for u in range(-2, 3):
-            for a in range(10):
-                arca = a * topcode.ARC * 0.1
-                c = self.readCode(topcode, topcode.unit + (topcode.unit * 0.05 * u), arca)
-                if c > maxc:
-                    maxc = c
-                    maxa = arca
-                    maxu = topcode.unit + (topcode.unit * 0.05 * u)
-        end = T.time()
-        print("decode(readcode()) time: " + str(1000 * (end - start)))
+        arcs = np.arange(10) * topcode.ARC * 0.1
+        best: int = 0
+        if self._confidence > 0:
+            # a confident first reading ends the search, else it joins it
+            conf, _ = self.readCodes(topcode.x, topcode.y, topcode.unit, arcs[:1])
+            if conf[0] > 0 and conf[0] >= self._confidence * MAX_CONFIDENCE:
+                probe.count("decode.early")
+            else:
+                rest, _ = self.readCodes(topcode.x, topcode.y, topcode.unit, arcs[1:])
+                conf = np.concatenate((conf, rest))
+                best = int(np.argmax(conf))
+        else:
+            conf, _ = self.readCodes(topcode.x, topcode.y, topcode.unit, arcs)
+            best = int(np.argmax(conf))
+        probe.stop("decode.read", start)
         """
         One last call to readCode to reset orientation and code
         """
-        if maxc > 0:
-            topcode.unit = maxu
-            self.readCode(topcode, topcode.unit, maxa)
-            topcode.code = topcode.rotateLowest(topcode.code, maxa)
+        if conf[best] > 0:
+            topcode.unit = topcode.unit + (topcode.unit * 0.05 * -2)
+            topcode.confidence = self.readCode(topcode, topcode.unit, float(arcs[best]))
+            topcode.code = topcode.rotateLowest(topcode.code, float(arcs[best]))
+        else:
+            probe.count("decode.reject.read")
 
         return topcode.code
+
+    def decodeMany(self, points: list[tuple[int, int]]) -> list[TopCode]:
+        """
+        Decodes the candidates at the given (x, y) points with a single
+        batched reading of all symbols. Returns one TopCode per point,
+        the same ones decode would produce one after another, with the
+        same tests and the same confidence threshold.
+        """
+        probe = self._probe
+        topcodes: list[TopCode] = []
+        for cx, cy in points:
+            topcode = TopCode()
+            self._locate(topcode, cx, cy)
+            topcodes.append(topcode)
+        found = [topcode for topcode in topcodes if topcode.unit >= 0]
+        cored = [topcode for topcode in found if self.coreSectors(topcode) >= _CORE_SECTORS]
+        probe.count("decode.reject.core", len(found) - len(cored))
+        found = cored
+        if not found:
+            return topcodes
+
+        x = np.array([topcode.x for topcode in found])[:, None]
+        y = np.array([topcode.y for topcode in found])[:, None]
+        unit = np.array([topcode.unit for topcode in found])[:, None]
+        arcs = np.arange(10) * TopCode._ARC * 0.1
+        if self._confidence > 0:
+            # confident first readings end their search, the others read the rest
+            conf = np.zeros((len(found), arcs.size), dtype=np.int64)
+            conf[:, :1], _ = self.readCodes(x, y, unit, arcs[:1])
+            early = (conf[:, 0] > 0) & (conf[:, 0] >= self._confidence * MAX_CONFIDENCE)
+            probe.count("decode.early", int(early.sum()))
+            if not early.all():
+                conf[~early, 1:], _ = self.readCodes(x[~early], y[~early], unit[~early], arcs[1:])
+        else:
+            conf, _ = self.readCodes(x, y, unit, arcs)
+
+        # early rows read nothing past arc 0, so their best arc is 0
+        best = np.argmax(conf, axis=1)
+        read = conf[np.arange(len(found)), best] > 0
+        probe.count("decode.reject.read", int((~read).sum()))
+        maxu = unit[:, 0] + (unit[:, 0] * 0.05 * -2)
+        maxa = arcs[best]
+        # last reading with the adjusted unit sets the code
+        conf, bits = self.readCodes(x[:, 0], y[:, 0], maxu, maxa)
+        for k, topcode in enumerate(found):
+            if read[k]:
+                topcode.unit = float(maxu[k])
+                topcode.code = int(bits[k]) if conf[k] > 0 else -1
+                topcode.confidence = int(conf[k])
+                topcode.code = topcode.rotateLowest(topcode.code, float(maxa[k]))
+        return topcodes
@@ -0,0 +1,114 @@
+"""
+Grid index over TopCode bullseyes.
+
+Every code is registered in all grid cells its bullseye touches, so
+asking whether a point lies in some bullseye only looks at the codes of
+one cell instead of every code found so far. The answer is the same as
+testing TopCode.inBullsEye for every code.
+Codes can also be registered with a different radius than their unit,
+e.g. the whole symbol or a region where decoding failed.
+mergeBoxes joins overlapping scan regions, reach and margin tell how
+far around a code center the pixels of a scan region have to go.
+
+python version by PapstJL4U
+"""
+from typing import Iterator
+from topcode import TopCode
+import math as math
+import wellner
+
+
+class BullsEyeIndex(object):
+    # edge length of a grid cell in pixels
+    _cell: float = 0.0
+    # (code, radius) registered per (column, row) cell
+    _cells: dict[tuple[int, int], list[tuple[TopCode, float]]]
+    # all codes in the order they were added
+    _codes: list[TopCode]
+
+    def __init__(self, cell: float | None = None):
+        """
+        cell is the edge length of a grid cell in pixels. By default it is
+        taken from the first code added (two units, the bullseye diameter).
+        """
+        self._cell = cell or 0.0
+        self._cells = {}
+        self._codes = []
+
+    def __len__(self) -> int:
+        return len(self._codes)
+
+    def __iter__(self) -> Iterator[TopCode]:
+        return iter(self._codes)
+
+    def add(self, topcode: TopCode, radius: float | None = None) -> None:
+        """
+        Registers the bullseye of the code, or the disk of the given
+        radius around its center
+        """
+        if radius is None:
+            radius = topcode.unit
+        if self._cell <= 0:
+            self._cell = max(8.0, 2 * radius)
+        # one pixel of slack, rounding must never drop a border point
+        r: float = abs(radius) + 1
+        x0, y0 = self._key(topcode.x - r, topcode.y - r)
+        x1, y1 = self._key(topcode.x + r, topcode.y + r)
+        entry = (topcode, radius)
+        for i in range(x0, x1 + 1):
+            for j in range(y0, y1 + 1):
+                self._cells.setdefault((i, j), []).append(entry)
+        self._codes.append(topcode)
+
+    def find(self, x: float, y: float) -> TopCode | None:
+        """Returns the first added code whose bullseye contains (x,y)"""
+        if self._cell <= 0:
+            return None
+        for topcode, radius in self._cells.get(self._key(x, y), ()):
+            # same test as TopCode.inBullsEye
+            left: float = (topcode.x - x) * (topcode.x - x) + (topcode.y - y) * (topcode.y - y)
+            if left <= radius * radius:
+                return topcode
+        return None
+
+    def contains(self, x: float, y: float) -> bool:
+        """Returns true if point (x,y) is in a registered bullseye"""
+        return self.find(x, y) is not None
+
+    def _key(self, x: float, y: float) -> tuple[int, int]:
+        return math.floor(x / self._cell), math.floor(y / self._cell)
+
+
+def mergeBoxes(boxes: list[list[int]]) -> list[list[int]]:
+    """Merges overlapping [x0, y0, x1, y1) boxes until none overlap"""
+    merged: list[list[int]] = []
+    for box in boxes:
+        box = list(box)
+        overlap = True
+        while overlap:
+            overlap = False
+            for other in merged:
+                if box[0] < other[2] and other[0] < box[2] and box[1] < other[3] and other[1] < box[3]:
+                    merged.remove(other)
+                    box = [min(box[0], other[0]), min(box[1], other[1]), max(box[2], other[2]), max(box[3], other[3])]
+                    overlap = True
+                    break
+        merged.append(box)
+    return merged
+
+
+def reach(maxu: float) -> int:
+    """
+    Pixels around a code center that decoding may read: half the
+    maximum code diameter with the widest unit adjustment, but at least
+    the 100 pixels readUnit walks, plus the 3x3 neighbourhood
+    """
+    return max(math.ceil(4 * 1.1 * maxu), 100) + 2
+
+
+def margin(maxu: float) -> int:
+    """
+    Pixels a scan region needs around the code centers it reports: the
+    reach of decoding plus the warm up of a new threshold walk
+    """
+    return reach(maxu) + wellner.WARMUP
@@ -0,0 +1,169 @@
+"""
+Scans images of any height in strips of rows with bounded memory.
+
+The threshold walk only carries its running sum from one row to the
+next, and the row above is blended in. Both are passed on from strip
+to strip (see wellner.threshold), so the binary data of every strip is
+exactly that of a full frame scan. Decoding a code needs the rows of
+its symbol, so a rolling window keeps the binary and candidate rows of
+the last strips: a code is decoded once the rows below its center are
+in the window far enough to read a code of the maximum diameter, and
+is emitted right away. Rows that no code can reach anymore are dropped.
+
+Memory is about width * (strip rows + 2 * reach) per plane, where
+reach comes from setMaxCodeDiameter, independent of the image height.
+
+Strips come from an iterable of numpy row blocks, from a raw file
+(rawBands) or from a Pillow image (imageBands), which reads
+uncompressed files (PPM/PGM, BMP, TIFF) strip by strip from disk.
+
+python version by PapstJL4U
+"""
+from typing import TYPE_CHECKING, BinaryIO, Iterable, Iterator
+from PIL import Image
+from topcode import TopCode
+import numpy as np
+import rawframes
+import wellner
+import bullseye
+import spatial
+
+if TYPE_CHECKING:
+    from scanner import Scanner
+
+# Pillow raw modes that can be read strip by strip
+_RAWMODES: dict[str, str] = {"L": "gray8", "RGB": "rgb24", "BGR": "bgr24"}
+
+
+def rawBands(
+    file: BinaryIO,
+    width: int,
+    height: int,
+    format: str = "gray8",
+    rows: int = 256,
+    offset: int = 0,
+    stride: int | None = None,
+    bottomUp: bool = False,
+) -> Iterator[np.ndarray]:
+    """
+    Reads gray strips of up to rows rows from an open raw file. Pixels
+    start at offset, every row takes stride bytes. bottomUp files store
+    the last row first (like BMP).
+    """
+    step: int = stride or width * rawframes.FORMATS[format]
+    for y0 in range(0, height, rows):
+        y1 = min(height, y0 + rows)
+        first = (height - y1) if bottomUp else y0
+        file.seek(offset + first * step)
+        data = bytearray((y1 - y0) * step)
+        file.readinto(data)
+        band = rawframes.gray(data, width, y1 - y0, format, step)
+        yield band[::-1] if bottomUp else band
+
+
+def imageBands(image: Image.Image, rows: int = 256) -> Iterator[np.ndarray]:
+    """
+    Strips of up to rows rows of a Pillow image. Uncompressed files
+    that have not been loaded yet are read strip by strip, everything
+    else is decoded by Pillow first.
+    """
+    tile = image.tile[0] if len(getattr(image, "tile", ())) == 1 else None
+    filename = getattr(image, "filename", None)
+    if tile is not None and filename and tile[0] == "raw" and tile[3][0] in _RAWMODES and tile[1][:2] == (0, 0):
+        rawmode, stride, orientation = tile[3]
+        with open(filename, "rb") as f:
+            yield from rawBands(
+                f, image.width, image.height, _RAWMODES[rawmode], rows, tile[2], stride or None, orientation < 0
+            )
+        return
+    for y0 in range(0, image.height, rows):
+        yield image.crop((0, y0, image.width, min(image.height, y0 + rows)))
+
+
+def scanStrips(scanner: "Scanner", strips: Iterable[np.ndarray]) -> Iterator[TopCode]:
+    """
+    Scans consecutive strips of rows (anything Scanner._ingest takes:
+    Pillow images, gray or RGB(A) arrays) and yields
+    the codes as soon as they are decoded, from top to bottom (strip by
+    strip). ccount and tcount of the scanner are set once all strips
+    are scanned. The scanner holds the current window.
+    """
+    margin: int = spatial.reach(scanner._maxu)
+    probe = scanner.probe
+    # absolute row of the first window row, rows read, rows decoded
+    top: int = 0
+    bottom: int = 0
+    done: int = 0
+    width: int = 0
+    gray = bw = cand = None
+    start: int = wellner.START
+    previous: np.ndarray | None = None
+    ccount: int = 0
+    tcount: int = 0
+    # codes near the last decoded rows, a code split into two clusters
+    # could be decoded from either side of the border
+    recent: list[TopCode] = []
+
+    strips = iter(strips)
+    while True:
+        strip = next(strips, None)
+        if strip is not None:
+            t = probe.start("ingest")
+            strip = scanner._ingest(strip)
+            probe.stop("ingest", t)
+            if strip.shape[0] == 0:
+                continue
+            if gray is None:
+                width = strip.shape[1]
+            elif strip.shape[1] != width:
+                raise ValueError("strip is %d pixels wide, expected %d" % (strip.shape[1], width))
+
+            odd: bool = bottom % 2 == 1
+            t = probe.start("threshold")
+            sbw, sums = wellner.threshold(strip, start, previous, odd)
+            probe.stop("threshold", t)
+            t = probe.start("candidates")
+            scand, count = bullseye.candidates(sbw, scanner._maxu, odd)
+            probe.stop("candidates", t)
+            probe.count("ccount", count)
+            start = wellner.walkEnd(sums, odd)
+            previous = sums[-1]
+            ccount += count
+            bottom += strip.shape[0]
+            if gray is None:
+                # the strip may be a buffer the next ingest overwrites
+                gray, bw, cand = np.array(strip), sbw, scand
+            else:
+                gray = np.concatenate((gray, strip))
+                bw = np.concatenate((bw, sbw))
+                cand = np.concatenate((cand, scand))
+
+        # rows whose codes can be read completely with the window
+        last: int = bottom if strip is None else bottom - margin
+        if gray is not None and last > done:
+            scanner._setPlanes(gray, bw, cand, 0)
+            codes = scanner._findCodes((done - top, last - top))
+            tcount += scanner.tcount
+            index = spatial.BullsEyeIndex()
+            for code in recent:
+                index.add(code)
+            recent = [code for code in recent if code.y >= last - margin]
+            for code in codes:
+                code.y += top
+                if index.contains(code.x, code.y):
+                    continue
+                index.add(code)
+                recent.append(code)
+                yield code
+            done = last
+
+            # drop rows no future code can reach
+            drop: int = done - margin - top
+            if drop > 0:
+                gray, bw, cand = gray[drop:].copy(), bw[drop:].copy(), cand[drop:].copy()
+                top += drop
+        if strip is None:
+            break
+
+    scanner._ccount = ccount
+    scanner._tcount = tcount
@@ -0,0 +1,75 @@
+"""
+Synthetic scenes and frame sequences for testing without a camera.
+Codes are rendered with TopCode.draw onto a white background.
+
+python version by PapstJL4U
+"""
+from typing import Iterator
+from PIL import Image, ImageFilter
+from topcode import TopCode, generateCodes
+import numpy as np
+import math as math
+
+
+def placeCodes(count: int, diameter: float, width: int, height: int, seed: int = 0) -> list[TopCode]:
+    """
+    Returns up to count codes with random ids, positions and rotations
+    that fit into the image without touching each other.
+    """
+    rng = np.random.default_rng(seed)
+    valid = generateCodes()
+    codes: list[TopCode] = []
+    r: float = diameter / 2
+    for _ in range(count * 50):
+        if len(codes) == count:
+            break
+        x = float(rng.uniform(r + 2, width - r - 2))
+        y = float(rng.uniform(r + 2, height - r - 2))
+        if any((c.x - x) ** 2 + (c.y - y) ** 2 < (diameter * 1.15) ** 2 for c in codes):
+            continue
+        code = TopCode()
+        code.code = valid[int(rng.integers(len(valid)))].code
+        code.setLocation(x, y)
+        code.diameter = diameter
+        code.orientation = float(rng.uniform(0, 2 * math.pi))
+        codes.append(code)
+    return codes
+
+
+def scene(
+    width: int, height: int, codes: list[TopCode], noise: float = 0.0, blur: float = 0.0, seed: int = 0
+) -> Image.Image:
+    """
+    Renders the codes into an RGB image. noise is the standard deviation
+    of gaussian pixel noise, blur the radius of a gaussian blur.
+    """
+    im = Image.new("RGB", (width, height), (255, 255, 255))
+    for code in codes:
+        code.draw(im)
+    if blur > 0:
+        im = im.filter(ImageFilter.GaussianBlur(blur))
+    if noise > 0:
+        rng = np.random.default_rng(seed)
+        pixels = np.asarray(im, dtype=np.float32) + rng.normal(0, noise, (height, width, 1))
+        im = Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8), mode="RGB")
+    return im
+
+
+def video(
+    frames: int, width: int, height: int, count: int = 4, diameter: float = 64, speed: float = 2.0, seed: int = 0
+) -> Iterator[Image.Image]:
+    """
+    Yields frames of codes drifting across the image by about speed
+    pixels (and a little rotation) per frame.
+    """
+    rng = np.random.default_rng(seed)
+    codes = placeCodes(count, diameter, width, height, seed)
+    angles = rng.uniform(0, 2 * math.pi, len(codes))
+    r: float = diameter / 2 + 2
+    for _ in range(frames):
+        yield scene(width, height, codes)
+        for code, angle in zip(codes, angles.tolist()):
+            x = min(max(code.x + speed * math.cos(angle), r), width - r)
+            y = min(max(code.y + speed * math.sin(angle), r), height - r)
+            code.setLocation(x, y)
+            code.orientation += 0.01
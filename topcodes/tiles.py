@@ -0,0 +1,91 @@
+"""
+Scans a single large image in parallel horizontal bands.
+
+Every band owns a core range of rows. It is thresholded and searched
+together with a margin above and below: enough rows to warm up the
+running sum of the threshold and to read a code of the maximum
+diameter whose center lies in the core. Only codes centered in the
+core of a band are kept, codes found twice near a band border are
+merged (the second one lies in the bullseye of the first).
+
+python version by PapstJL4U
+"""
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import TYPE_CHECKING
+from topcode import TopCode
+import numpy as np
+import os as os
+import spatial
+import records
+
+if TYPE_CHECKING:
+    from scanner import Scanner
+    from instrument import Probe
+
+
+def bands(height: int, count: int, overlap: int) -> list[tuple[int, int, int, int]]:
+    """
+    Splits height rows into count bands. Returns the scanned rows
+    [y0, y1) and the core rows [c0, c1) of every band. Bands start on
+    even rows, so their serpentine walk runs like the one of the image.
+    """
+    count = max(1, min(count, height // 2 or 1))
+    cuts = [2 * round(height * k / count / 2) for k in range(count)] + [height]
+    return [(max(0, c0 - overlap) & ~1, min(height, c1 + overlap), c0, c1) for c0, c1 in zip(cuts[:-1], cuts[1:])]
+
+
+def _scanBand(scanner: "Scanner", gray: np.ndarray) -> tuple[np.ndarray, int, int, "Probe"]:
+    """
+    Scans one band in a worker, returns its codes (as records, a
+    single buffer to send back), ccount, tcount and the measurements
+    of its probe
+    """
+    codes = scanner._scan_gray(gray)
+    return records.fromCodes(codes), scanner.ccount, scanner.tcount, scanner.probe
+
+
+def _band(scanner: "Scanner") -> "Scanner":
+    """A scanner for one band, reporting to a fork of the probe"""
+    stage = scanner._stage()
+    stage._probe = scanner.probe.fork()
+    return stage
+
+
+def scanTiled(
+    scanner: "Scanner", gray: np.ndarray, count: int | None = None, executor: Executor | None = None
+) -> list[TopCode]:
+    """
+    Scans the gray plane in count bands (default: one per core) on the
+    executor (default: a process pool just for this call). Codes are
+    returned in band order, ccount and tcount of the scanner are the
+    sums over all bands.
+    """
+    count = count or os.cpu_count() or 1
+    jobs = bands(gray.shape[0], count, spatial.margin(scanner._maxu))
+    own = executor is None
+    if own:
+        executor = ProcessPoolExecutor(min(count, len(jobs)))
+    try:
+        futures = [executor.submit(_scanBand, _band(scanner), gray[y0:y1]) for y0, y1, _, _ in jobs]
+        results = [future.result() for future in futures]
+    finally:
+        if own:
+            executor.shutdown()
+
+    found = spatial.BullsEyeIndex()
+    ccount: int = 0
+    tcount: int = 0
+    for (y0, _, c0, c1), (band, cc, tc, measured) in zip(jobs, results):
+        scanner.probe.merge(measured)
+        ccount += cc
+        tcount += tc
+        for code in records.toCodes(band):
+            code.y += y0
+            if not (c0 <= code.y < c1):
+                continue
+            if found.contains(code.x, code.y):
+                continue
+            found.add(code)
+    scanner._ccount = ccount
+    scanner._tcount = tcount
+    return list(found)
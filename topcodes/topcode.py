@@ -1,5 +1,6 @@
 """Describes the TopCodes"""
 import math as math
+import numpy as np
 from PIL import Image, ImageDraw
 
 """
@@ -21,7 +22,45 @@ python version by PapstJL4U
 """
 
 
+def _codeTables(sectors: int = 13) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Answers checksum and rotateLowest for all 2^13 bit patterns at once.
+    Returns the checksum flags, the lowest rotation and the number
+    of the rotation step that produced it (0 if the bits are lowest).
+    """
+    mask: int = (1 << sectors) - 1
+    bits = np.arange(mask + 1, dtype=np.int32)
+    ones = ((bits[:, None] >> np.arange(sectors)) & 0x01).sum(axis=1)
+    # rotations by 1 .. sectors, the same order rotateLowest tries them
+    steps = np.arange(1, sectors + 1)
+    rotations = ((bits[:, None] << steps) | (bits[:, None] >> (sectors - steps))) & mask
+    lowest = rotations.min(axis=1)
+    # argmin picks the first rotation reaching the minimum, like the strict < of the loop
+    step = np.where(lowest < bits, rotations.argmin(axis=1) + 1, 0)
+    return ones == 5, lowest, step
+
+
+# checksum flag and lowest rotation of every 13 bit pattern
+CHECKSUM_TABLE, LOWEST_TABLE, _ROTATION = _codeTables()
+# lists are faster for single lookups
+_CHECKSUM_LIST: list[bool] = CHECKSUM_TABLE.tolist()
+_LOWEST_LIST: list[int] = LOWEST_TABLE.tolist()
+_ROTATION_LIST: list[int] = _ROTATION.tolist()
+# all 99 valid codes in ascending order and their index
+VALID_CODES: tuple[int, ...] = tuple(
+    np.flatnonzero(CHECKSUM_TABLE & (LOWEST_TABLE == np.arange(LOWEST_TABLE.size))).tolist()
+)
+_CODE_INDEX: dict[int, int] = {code: index for index, code in enumerate(VALID_CODES)}
+
+
+def codeIndex(code: int) -> int:
+    """Returns the index (0-98) of a valid code, -1 for any other value"""
+    return _CODE_INDEX.get(code, -1)
+
+
 class TopCode(object):
+    __slots__ = ("_code", "_unit", "_orientation", "_x", "_y", "_confidence")
+
     # Number of sectors in the data ring
     _sectors: int = 13
     # Width of the code in units (ring widths)
@@ -40,6 +79,8 @@ class TopCode(object):
     _x: float
     # Vertical center of a symbol
     _y: float
+    # Confidence of the reading that produced the code, 0 if not read
+    _confidence: int
 
     def __init__(self) -> None:
         """
@@ -55,8 +96,8 @@ class TopCode(object):
         self._x: float = 0.0
         # Vertical center of a symbol
         self._y: float = 0.0
-        # Buffer used to decode sectors
-        self._core: list[int] = [0] * self._width
+        # Confidence of the reading that produced the code
+        self._confidence: int = 0
 
     def by_value(self, code: int = 0):
         """
@@ -85,8 +126,8 @@ class TopCode(object):
         return TopCode._sectors
 
     def get_core(self) -> list[int]:
-        # Buffer used to decode sectors
-        return self._core
+        # New buffer to decode sectors, one sample per ring
+        return [0] * TopCode._width
 
     @property
     def ARC(self) -> float:
@@ -124,6 +165,18 @@ class TopCode(object):
         """
         self._orientation = ori
 
+    @property
+    def confidence(self) -> int:
+        """
+        Returns the summed ring contrast of the reading that decoded
+        this symbol, 0 if it wasn't read. Higher is more certain.
+        """
+        return self._confidence
+
+    @confidence.setter
+    def confidence(self, confidence: int):
+        self._confidence = confidence
+
     @property
     def diameter(self) -> float:
         """
@@ -188,22 +241,26 @@ class TopCode(object):
         """
         arca = arca_para - (self.ARC * 0.65)
 
-        for i in range(1, self.SECTORS + 1):
-            bits = ((bits << 1) & mask) | (bits >> (self.SECTORS - 1))
-            if bits < minimum:
-                minimum = bits
+        if 0 <= bits <= mask:
+            # precomputed, see _codeTables
+            minimum = _LOWEST_LIST[bits]
+            i: int = _ROTATION_LIST[bits]
+            if i > 0:
                 self._orientation = i * -1 * self.ARC
+        else:
+            for i in range(1, self.SECTORS + 1):
+                bits = ((bits << 1) & mask) | (bits >> (self.SECTORS - 1))
+                if bits < minimum:
+                    minimum = bits
+                    self._orientation = i * -1 * self.ARC
 
         self._orientation += arca
         return minimum
 
     def checksum(self, bits: int) -> bool:
         """Only Codes with a checksum of 5 are valid"""
-        summ: int = 0
-        for i in range(self.SECTORS):
-            summ += bits & 0x01
-            bits = bits >> 1
-        return summ == 5
+        # only the lowest 13 bits count, see _codeTables
+        return _CHECKSUM_LIST[bits & 0x1FFF]
 
     def inBullsEye(self, px: float, py: float) -> bool:
         """
@@ -271,25 +328,12 @@ class TopCode(object):
 
 
 def generateCodes() -> list[TopCode]:
-    n: int = 99
-    base: int = 0
-    code: TopCode = TopCode()
-    tcodes: list[TopCode] = [code] * n
-
-    bits: int = 0
-    count: int = 0
-
-    while count < n:
-        bits = code.rotateLowest(base, 0)
-
-        # found a valid code
-        if (bits == base) and code.checksum(bits):
-            code.code = bits
-            code.orientation = 0
-            tcodes[count] = code
-            code = TopCode()
-            count += 1
-
-        base += 1
+    """Returns a TopCode for each of the 99 valid codes"""
+    tcodes: list[TopCode] = []
+    for bits in VALID_CODES:
+        code: TopCode = TopCode()
+        code.code = bits
+        code.orientation = 0
+        tcodes.append(code)
 
     return tcodes
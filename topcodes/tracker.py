@@ -0,0 +1,160 @@
+"""
+Scanner mode for continuous video feeds.
+
+Codes barely move between two frames of a camera feed, so most frames
+only need to be scanned around the codes of the previous frame. The
+TrackingScanner remembers the topcodes it found last, scans padded
+regions around them and falls back to a full frame scan every few
+frames (to pick up new codes) or as soon as a tracked code is lost.
+
+python version by PapstJL4U
+"""
+from topcode import TopCode
+from scanner import Scanner
+from spatial import mergeBoxes
+import numpy as np
+import math as math
+import wellner
+import instrument
+
+
+class TrackingScanner(Scanner):
+    __slots__ = ("_tracks", "_since_full", "_cadence", "_reach", "_full", "_regions")
+
+    # codes found in the previous frame
+    _tracks: list[TopCode]
+    # frames scanned since the last full frame scan
+    _since_full: int
+    # a full frame scan is done at least every _cadence frames
+    _cadence: int
+    # regions reach this many diameters beyond the bullseye of a code
+    _reach: float
+    # True if the last frame was scanned completely
+    _full: bool
+    # scans the regions of interest
+    _regions: Scanner
+
+    def __init__(self, engine: str = "array", cadence: int = 10, reach: float = 0.5):
+        self._regions = Scanner(engine)
+        super().__init__(engine)
+        self._tracks = []
+        self._since_full = 0
+        self._full = True
+        self.setCadence(cadence)
+        self._reach = reach
+
+    def setEngine(self, engine: str = "array") -> None:
+        super().setEngine(engine)
+        self._regions.setEngine(engine)
+
+    def setMaxCodeDiameter(self, diameter: int = 0) -> None:
+        super().setMaxCodeDiameter(diameter)
+        self._regions.setMaxCodeDiameter(diameter)
+
+    def setProbe(self, probe: instrument.Probe | None = None) -> None:
+        super().setProbe(probe)
+        self._regions.setProbe(probe)
+
+    def setBufferReuse(self, reuse: bool = True) -> None:
+        super().setBufferReuse(reuse)
+        self._regions.setBufferReuse(reuse)
+
+    def setConfidenceThreshold(self, threshold: float = 0.0) -> None:
+        super().setConfidenceThreshold(threshold)
+        self._regions.setConfidenceThreshold(threshold)
+
+    @property
+    def residentBytes(self) -> int:
+        return super().residentBytes + self._regions.residentBytes
+
+    def setCadence(self, cadence: int = 10) -> None:
+        """
+        Sets how often (in frames) the whole frame is scanned. 1 scans
+        every frame completely, larger values find new codes later.
+        """
+        if cadence < 1:
+            raise ValueError("cadence must be at least 1")
+        self._cadence = cadence
+
+    def reset(self) -> None:
+        """Forgets all tracked codes, the next frame is scanned completely"""
+        self._tracks = []
+        self._since_full = 0
+
+    @property
+    def tracks(self) -> list[TopCode]:
+        """Returns the codes tracked from the last frame"""
+        return list(self._tracks)
+
+    @property
+    def fullScan(self) -> bool:
+        """
+        Returns True if the last frame was scanned completely. Only
+        then do the pixel accessors and getPreview describe that frame.
+        """
+        return self._full
+
+    def regions(self, width: int, height: int) -> list[list[int]]:
+        """
+        Returns the [x0, y0, x1, y1) boxes that are scanned around the
+        tracked codes, with a margin to warm up the running sum. Boxes
+        start on even rows, their serpentine walk runs like the one of
+        the frame.
+        """
+        boxes: list[list[int]] = []
+        for track in self._tracks:
+            r: float = track.diameter * (0.5 + self._reach) + wellner.WARMUP
+            boxes.append(
+                [
+                    max(0, math.floor(track.x - r)),
+                    max(0, math.floor(track.y - r)) & ~1,
+                    min(width, math.ceil(track.x + r) + 1),
+                    min(height, math.ceil(track.y + r) + 1),
+                ]
+            )
+        return mergeBoxes(boxes)
+
+    def _scan_gray(self, gray: np.ndarray) -> list[TopCode]:
+        self._since_full += 1
+        codes: list[TopCode] | None = None
+        if self._tracks and self._since_full < self._cadence:
+            codes = self._scanTracks(gray)
+        if codes is None:
+            codes = super()._scan_gray(gray)
+            self._since_full = 0
+            self._full = True
+        else:
+            self._full = False
+        self._tracks = codes
+        return codes
+
+    def _scanTracks(self, gray: np.ndarray) -> list[TopCode] | None:
+        """
+        Scans the regions around the tracked codes.
+        Returns None if a tracked code was lost.
+        """
+        height, width = gray.shape
+        codes: list[TopCode] = []
+        ccount: int = 0
+        tcount: int = 0
+        for x0, y0, x1, y1 in self.regions(width, height):
+            for code in self._regions._scan_gray(gray[y0:y1, x0:x1]):
+                code.setLocation(code.x + x0, code.y + y0)
+                codes.append(code)
+            ccount += self._regions.ccount
+            tcount += self._regions.tcount
+
+        for track in self._tracks:
+            if not any(self._same(track, code) for code in codes):
+                return None
+
+        self._ccount = ccount
+        self._tcount = tcount
+        return codes
+
+    @staticmethod
+    def _same(track: TopCode, code: TopCode) -> bool:
+        """True if code is the tracked code, moved less than a diameter"""
+        dx: float = track.x - code.x
+        dy: float = track.y - code.y
+        return code.code == track.code and dx * dx + dy * dy <= track.diameter * track.diameter
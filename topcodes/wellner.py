@@ -0,0 +1,191 @@
+"""
+Array based version of the Wellner adaptive threshold used by the Scanner.
+
+"Adaptive Thresholding for the DigitalDesk"
+EuroPARC Technical Report EPC-93-110
+
+The reference implementation walks the image pixel by pixel in a
+serpentine order (left-2-right on even rows, right-2-left on odd rows)
+and keeps one running sum over the whole walk:
+
+    summ += a - (summ // s)
+
+The floor division makes the filter non linear, so it can't be
+written as a convolution. It can however be run for all rows at once,
+one column after the other, if the start value of every row is known.
+Rows are first filtered from a guessed start value, afterwards every
+row whose guess was wrong is filtered again until its new running sum
+meets the old one. From that point on both are identical, so the
+rest of the row is already correct. Real images usually merge after
+a few dozen pixels, which keeps the correction passes short.
+
+python version by PapstJL4U
+"""
+from buffers import Buffers
+import numpy as np
+
+# Number of pixels the running sum approximately spans
+S: int = 30
+# Start value of the running sum for the very first pixel
+START: int = 128
+# Pixels a walk that starts with a wrong sum needs to catch up: the error
+# (at most 255 * S) shrinks by 1 - 1/S per pixel and is below S, one gray
+# level of the local average, after S * ln(255) pixels
+WARMUP: int = 167
+# A pixel is black if it is darker than F * the local average
+# (threshold compares 40 * gray with 39 * average, exactly the same)
+F: float = 0.975
+# Below this many wrong rows corrections are done row by row
+_SERIAL_ROWS: int = 32
+
+
+def _walk(plane: np.ndarray, out: np.ndarray, odd: bool = False) -> np.ndarray:
+    """
+    Copies plane in walking order, column major: out[t, j] is the t-th
+    pixel of row j (odd rows are mirrored). With odd=True the first row
+    is an odd row of the image.
+    """
+    mirrored: int = 0 if odd else 1
+    out[:, 1 - mirrored :: 2] = plane[1 - mirrored :: 2].T
+    out[:, mirrored::2] = plane[mirrored::2, ::-1].T
+    return out
+
+
+def _unwalk(walk: np.ndarray, out: np.ndarray, odd: bool = False) -> np.ndarray:
+    """Inverse of _walk, back to image coordinates"""
+    mirrored: int = 0 if odd else 1
+    out[1 - mirrored :: 2] = walk[:, 1 - mirrored :: 2].T
+    out[mirrored::2] = walk[::-1, mirrored::2].T
+    return out
+
+
+def _correct_rows(pt: np.ndarray, st: np.ndarray, starts: np.ndarray, rows: np.ndarray) -> None:
+    """
+    Filters the given rows again from their (new) start values, but
+    stops for every row as soon as its running sum equals the old one.
+    pt and st hold the walk in column major order (st[column, row]).
+    """
+    summ = starts[rows]
+    quot = np.empty_like(summ)
+    for t in range(pt.shape[0]):
+        np.floor_divide(summ, S, out=quot)
+        summ += pt[t, rows]
+        summ -= quot
+        same = summ == st[t, rows]
+        st[t, rows] = summ
+        if same.any():
+            keep = ~same
+            rows = rows[keep]
+            if rows.size == 0:
+                return
+            summ = summ[keep]
+            quot = quot[keep]
+
+
+def _correct_row(pt: np.ndarray, st: np.ndarray, start: int, row: int) -> None:
+    """Single row version of _correct_rows (cheaper in pure python)"""
+    pixels = pt[:, row].tolist()
+    old = st[:, row].tolist()
+    summ: int = start
+    for t, a in enumerate(pixels):
+        summ += a - (summ // S)
+        if summ == old[t]:
+            break
+        st[t, row] = summ
+
+
+def running_sums(
+    gray: np.ndarray, start: int = START, odd: bool = False, buffers: Buffers | None = None
+) -> np.ndarray:
+    """
+    Running sum of the serpentine walk for every pixel, in image
+    coordinates. Bit identical to the sums of the per pixel loop.
+    A band of rows further down the image continues the walk with the
+    start sum where the band above ended (see walkEnd), odd tells if
+    its first row is an odd row of the image.
+    Large arrays come from buffers (see buffers.py), if given.
+    """
+    buffers = buffers or Buffers()
+    height, width = gray.shape
+    # walking order, column major: pt[t, j] is the t-th pixel of row j
+    pt = _walk(gray, buffers.get("wellner.walk", (width, height), np.int32), odd)
+    st = buffers.get("wellner.walksums", (width, height), np.int32)
+
+    # first pass from a flat guess, all rows at once
+    starts = np.full(height, START, dtype=np.int32)
+    starts[:1] = start
+    summ = starts.copy()
+    quot = np.empty_like(summ)
+    for t in range(width):
+        np.floor_divide(summ, S, out=quot)
+        summ += pt[t]
+        summ -= quot
+        st[t] = summ
+
+    # every row starts where the previous one ended
+    while True:
+        wanted = np.empty_like(starts)
+        wanted[0] = start
+        wanted[1:] = st[width - 1, :-1]
+        rows = np.flatnonzero(wanted != starts)
+        if rows.size == 0:
+            break
+        if rows.size > _SERIAL_ROWS:
+            starts[rows] = wanted[rows]
+            _correct_rows(pt, st, starts, rows)
+            continue
+        # few wrong rows left, walk them in order so a
+        # changed row end is fixed right away
+        for j in range(rows[0], height):
+            first = start if j == 0 else int(st[width - 1, j - 1])
+            if first != starts[j]:
+                starts[j] = first
+                _correct_row(pt, st, first, j)
+
+    return _unwalk(st, buffers.get("wellner.sums", (height, width), np.int32), odd)
+
+
+def walkEnd(sums: np.ndarray, odd: bool = False) -> int:
+    """
+    Running sum after the last pixel of a band, the start sum of the
+    next band. odd is the parity of the first row of the band.
+    """
+    height: int = sums.shape[0]
+    # even rows end on the right, odd rows on the left
+    return int(sums[-1, 0] if (height - 1 + odd) % 2 else sums[-1, -1])
+
+
+def threshold(
+    gray: np.ndarray,
+    start: int = START,
+    previous: np.ndarray | None = None,
+    odd: bool = False,
+    buffers: Buffers | None = None,
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Wellner adaptive threshold of a gray plane (values 0-255).
+    Returns the binary plane (0 black, 1 white) and the running sums.
+    For a band further down the image, start and odd continue the walk
+    (see running_sums) and previous are the running sums of the row
+    above the band. With buffers the returned planes are reused buffers.
+    """
+    buffers = buffers or Buffers()
+    height, width = gray.shape
+    sums = running_sums(gray, start, odd, buffers)
+    limit = buffers.get("wellner.limit", (height, width), np.int32)
+    if previous is None:
+        # the first row has no previous row to blend with
+        np.floor_divide(sums[0], S, out=limit[0])
+    else:
+        np.add(sums[0], previous, out=limit[0])
+        np.floor_divide(limit[0], 2 * S, out=limit[0])
+    np.add(sums[1:], sums[:-1], out=limit[1:])
+    np.floor_divide(limit[1:], 2 * S, out=limit[1:])
+
+    # gray >= limit * F, for F = 39 / 40 the same in integers
+    np.multiply(limit, 39, out=limit)
+    scaled = buffers.get("wellner.gray", (height, width), np.int32)
+    np.multiply(gray, 40, out=scaled, dtype=np.int32)
+    white = buffers.get("wellner.white", (height, width), np.bool_)
+    np.greater_equal(scaled, limit, out=white)
+    return white.view(np.uint8), sums